@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the elliptic curve backends on BIP32 derivation and signing::
+
+    $ python benchmarks/bench_backend.py
+
+"""
+from __future__ import print_function, unicode_literals
+
+import hashlib
+import timeit
+
+from spool.backend import PycoinBackend, Secp256k1Backend, coincurve
+from spool.wallet import Wallet
+
+MASTER_SECRET = b'MaStErPaSsWoRd'
+NUMBER = 200
+
+
+def bench(backend):
+    def derive():
+        wallet = Wallet(MASTER_SECRET, cache_size=0, backend=backend)
+        wallet.address_from_path('2016/5/3/10/1/0/1')
+
+    wif = Wallet(MASTER_SECRET).subkey_for_path('0').wif()
+    msghash = hashlib.sha256(b'spool').digest()
+
+    def sign():
+        backend.sign(msghash, wif)
+
+    for name, func in (('derive 7 levels', derive), ('sign', sign)):
+        seconds = timeit.timeit(func, number=NUMBER) / NUMBER
+        print('{:<10} {:<16} {:8.3f} ms'.format(backend.name, name,
+                                                seconds * 1000))
+
+
+if __name__ == '__main__':
+    bench(PycoinBackend())
+    if coincurve is None:
+        print('coincurve is not installed, skipping the secp256k1 backend')
+    else:
+        bench(Secp256k1Backend())
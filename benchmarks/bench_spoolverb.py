@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the cost of decoding a verb::
+
+    $ python benchmarks/bench_spoolverb.py
+
+"""
+from __future__ import print_function, unicode_literals
+
+import timeit
+
+from spool import Spoolverb
+
+VERBS = ['ASCRIBESPOOL01PIECE', 'ASCRIBESPOOL01EDITIONS10',
+         'ASCRIBESPOOL01REGISTER1', 'ASCRIBESPOOL01TRANSFER1',
+         'ASCRIBESPOOL01LOAN1/150526150528', 'ASCRIBESPOOL01FUEL']
+NUMBER = 20000
+
+
+def bench(name, func, verbs):
+    seconds = timeit.timeit(lambda: func(verbs), number=NUMBER // len(verbs))
+    print('{:<24} {:8.2f} us/verb'.format(
+        name, seconds / (NUMBER // len(verbs) * len(verbs)) * 10 ** 6))
+
+
+if __name__ == '__main__':
+    bytes_verbs = [verb.encode('ascii') for verb in VERBS]
+    bench('from_verb str', lambda verbs: [Spoolverb.from_verb(v)
+                                          for v in verbs], VERBS)
+    bench('from_verb bytes', lambda verbs: [Spoolverb.from_verb(v)
+                                            for v in verbs], bytes_verbs)
+    bench('decode_many str', Spoolverb.decode_many, VERBS)
+    bench('decode_many bytes', Spoolverb.decode_many, bytes_verbs)
+    bench('decode_many repeated', Spoolverb.decode_many, VERBS * 50)
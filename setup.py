@@ -61,6 +61,10 @@ dev_require = [
     'ipython',
 ]
 
+secp256k1_require = [
+    'coincurve>=5.0.0',
+]
+
 docs_require = [
     'Sphinx>=1.3.5',
     'sphinx-autobuild',
@@ -97,5 +101,6 @@ setup(
         'test': tests_require,
         'dev': dev_require + tests_require + docs_require,
         'docs': docs_require,
+        'secp256k1': secp256k1_require,
     },
 )
@@ -7,6 +7,7 @@ from .spoolverb import Spoolverb     # noqa
 from .spoolex import BlockchainSpider    # noqa
 from .ownership import Ownership     # noqa
 from .file import File   # noqa
+from .file import PieceHash  # noqa
 from .wallet import Wallet   # noqa
 
 
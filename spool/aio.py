@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+Asyncio counterparts of the blocking methods.
+
+.. note:: This module requires python 3.5 or above.
+
+"""
+from __future__ import absolute_import, unicode_literals
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from .file import File, FileHasher
+from .ownership import Ownership
+from .spoolex import BlockchainSpider
+
+# number of bytes read at a time by the executor threads
+ASYNC_CHUNK_SIZE = 1024 * 1024
+
+
+def _digest(filename, chunk_size, algorithms, cancelled):
+    """
+    Runs in an executor thread. Stops reading as soon as ``cancelled`` is
+    set.
+
+    Returns:
+        dict: hexadecimal digests of the file, by algorithm name, or
+        ``None`` if cancelled.
+
+    """
+    hasher = FileHasher(algorithms=algorithms)
+    with open(filename, 'rb') as f:
+        for chunk in iter(partial(f.read, chunk_size), b''):
+            if cancelled.is_set():
+                return None
+            hasher.update(chunk)
+    return hasher.digests
+
+
+def _get(spider, hash, kwargs):
+    """
+    Runs in an executor thread, with the :class:`Transactions` instance of
+    the thread.
+
+    """
+    return spider._transactions().get(hash, **kwargs)
+
+
+class AsyncFileHasher(object):
+    """
+    Hashes files without blocking the event loop. Reading and hashing run
+    in a bounded pool of threads, and at most ``concurrency`` files are
+    hashed at a time::
+
+        hasher = AsyncFileHasher(max_workers=4)
+        f = await hasher.hash('piece.tif', title='piece title')
+        f.file_hash, f.file_hash_metadata
+
+    Cancelling a call to :meth:`hash` stops the reading of the file within
+    one chunk.
+
+    """
+
+    def __init__(self, max_workers=4, concurrency=None,
+                 chunk_size=ASYNC_CHUNK_SIZE):
+        """
+        Args:
+            max_workers (int): Number of executor threads. Defaults to 4.
+            concurrency (int): Maximum number of files hashed at a time.
+                Defaults to ``max_workers``.
+            chunk_size (int): Number of bytes read at a time. Defaults to
+                :const:`ASYNC_CHUNK_SIZE`.
+
+        """
+        self.max_workers = max_workers
+        self.concurrency = concurrency or max_workers
+        self.chunk_size = chunk_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._semaphore = None
+
+    async def hash(self, filename, testnet=False, algorithms=(), **kwargs):
+        """
+        Args:
+            filename (str): Name of the file
+            testnet (bool): testnet flag. Defaults to False
+            algorithms (Iterable[str]): See :class:`~spool.File`.
+            **kwargs: Additional metadata to be encoded with the file. See
+                :class:`~spool.File`.
+
+        Returns:
+            :class:`~spool.File` instance
+
+        """
+        # created lazily so that it is bound to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        loop = asyncio.get_event_loop()
+        cancelled = threading.Event()
+        async with self._semaphore:
+            try:
+                digests = await loop.run_in_executor(
+                    self._executor, _digest, filename, self.chunk_size,
+                    tuple(algorithms), cancelled)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+        return File._from_digests(digests, testnet=testnet, **kwargs)
+
+    async def hash_many(self, paths, metadata=None, testnet=False,
+                        algorithms=()):
+        """
+        Args:
+            paths (Iterable[str]): Names of the files to hash.
+            metadata (dict): See :meth:`~spool.File.hash_many`.
+            testnet (bool): testnet flag. Defaults to False
+            algorithms (Iterable[str]): See :class:`~spool.File`.
+
+        Returns:
+            list: :class:`~spool.File` instances, in the order of
+            ``paths``.
+
+        """
+        metadata = metadata or {}
+        return await asyncio.gather(*[
+            self.hash(path, testnet=testnet, algorithms=algorithms,
+                      **metadata.get(path, {}))
+            for path in paths])
+
+    def close(self):
+        """
+        Shuts down the executor threads.
+
+        """
+        self._executor.shutdown(wait=False)
+
+
+class AsyncBlockchainSpider(object):
+    """
+    Asyncio counterpart of :class:`~spool.BlockchainSpider`::
+
+        spider = AsyncBlockchainSpider(testnet=True)
+        tree = await spider.history(piece_address)
+
+    The requests to the bitcoin service run in a bounded pool of threads,
+    so that the transactions of a piece are retrieved concurrently without
+    blocking the event loop. The trees are built as
+    :meth:`BlockchainSpider.history` builds them.
+
+    """
+
+    def __init__(self, testnet=False, service='blockr', username='',
+                 password='', host='', port='', max_workers=8, timeout=None):
+        """
+        Args:
+            testnet (bool): Whether to use the mainnet or testnet.
+                Defaults to the mainnet (:const:`False`).
+            service (str): See :class:`~spool.BlockchainSpider`.
+            username (str): username for jsonrpc communications
+            password (str): password for jsonrpc communications
+            hostname (str): hostname of the bitcoin node when using jsonrpc
+            port (str): port number of the bitcoin node when using jsonrpc
+            max_workers (int): Maximum number of concurrent requests.
+                Defaults to 8.
+            timeout (float): Maximum number of seconds to wait for each
+                request. Defaults to ``None``, to wait for as long as it
+                takes.
+
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._spider = BlockchainSpider(testnet=testnet, service=service,
+                                        username=username, password=password,
+                                        host=host, port=port)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    async def _get(self, hash, **kwargs):
+        """
+        Returns:
+            dict: result of :meth:`transactions.Transactions.get`.
+
+        Raises:
+            asyncio.TimeoutError: If the request takes more than
+                :attr:`timeout` seconds.
+
+        """
+        loop = asyncio.get_event_loop()
+        return await asyncio.wait_for(
+            loop.run_in_executor(self._executor, _get, self._spider, hash,
+                                 kwargs),
+            self.timeout)
+
+    async def history(self, hash):
+        """
+        Args:
+            hash (str): Hash of the file to check. Can be created with the
+                :class:`~spool.File` class
+
+        Returns:
+            dict: Ownsership tree of all editions of a piece. See
+            :meth:`BlockchainSpider.history`.
+
+        """
+        txs = (await self._get(hash, max_transactions=10000))['transactions']
+        txs = await asyncio.gather(*[self._get(tx['txid']) for tx in txs])
+        return BlockchainSpider._tree(txs)
+
+    async def txids(self, address):
+        """
+        Args:
+            address (str): Bitcoin address, e.g. the hash of a file.
+
+        Returns:
+            list: Ids of the transactions of the address.
+
+        """
+        txs = await self._get(address, max_transactions=10000)
+        return [tx['txid'] for tx in txs['transactions']]
+
+    def close(self):
+        """
+        Shuts down the executor threads.
+
+        """
+        self._executor.shutdown(wait=False)
+
+
+class AsyncOwnership(Ownership):
+    """
+    Asyncio counterpart of :class:`~spool.Ownership`. Instances are
+    created with :meth:`create`, which retrieves the history of the piece
+    without blocking the event loop::
+
+        ownership = await AsyncOwnership.create(address, piece_address,
+                                                edition_number, spider)
+        ownership.can_transfer
+
+    The ``can_*`` properties give the same answers as those of
+    :class:`~spool.Ownership`.
+
+    """
+
+    def __init__(self, address, piece_address, edition_number, tree,
+                 testnet=False):
+        """
+        Args:
+            address (str): Bitcoin address to check ownership over
+                ``piece_address``.
+            piece_address (str): Bitcoin address of the piece to check.
+            edition_number (int): The edition number of the piece.
+            tree (dict): Ownership tree of the piece, as returned by
+                :meth:`AsyncBlockchainSpider.history`.
+            testnet (bool): Whether to use the mainnet or testnet.
+                Defaults to the mainnet (:const:`False`).
+
+        """
+        self.address = address
+        self.piece_address = piece_address
+        self.edition_number = edition_number
+        self.testnet = testnet
+        self._tree = tree
+        self.reason = ''
+
+    @classmethod
+    async def create(cls, address, piece_address, edition_number,
+                     spider=None, testnet=False):
+        """
+        Args:
+            address (str): Bitcoin address to check ownership over
+                ``piece_address``.
+            piece_address (str): Bitcoin address of the piece to check.
+            edition_number (int): The edition number of the piece.
+            spider (AsyncBlockchainSpider): Spider retrieving the history
+                of the piece. Defaults to an
+                :class:`AsyncBlockchainSpider` for ``testnet``, closed
+                once the history is retrieved.
+            testnet (bool): Whether to use the mainnet or testnet.
+                Defaults to the mainnet (:const:`False`).
+
+        Returns:
+            :class:`AsyncOwnership` instance.
+
+        """
+        if spider is None:
+            spider = AsyncBlockchainSpider(testnet=testnet)
+            try:
+                tree = await spider.history(piece_address)
+            finally:
+                spider.close()
+        else:
+            tree = await spider.history(piece_address)
+        return cls(address, piece_address, edition_number, tree,
+                   testnet=testnet)
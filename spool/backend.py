@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+Elliptic curve backends used for BIP32 derivation and signing.
+
+:class:`PycoinBackend` relies on the pure python implementations of
+``pycoin`` and ``pybitcointools``. :class:`Secp256k1Backend` relies on
+the native ``libsecp256k1`` library, through the ``coincurve`` package,
+for the elliptic curve multiplications. Both backends derive the same
+nodes and produce the same signatures, bit for bit.
+
+:func:`default_backend` returns the fastest backend available.
+
+"""
+from __future__ import absolute_import, unicode_literals
+
+import hashlib
+import hmac
+import struct
+from builtins import object, range
+
+import bitcoin
+from pycoin import ecdsa
+from pycoin.encoding import from_bytes_32, public_pair_to_sec, to_bytes_32
+from pycoin.key.BIP32Node import BIP32Node, PublicPrivateMismatchError
+from pycoin.key.bip32 import DerivationError
+
+try:
+    import coincurve
+except ImportError:
+    coincurve = None
+
+ORDER = ecdsa.generator_secp256k1.order()
+
+
+def _node(netcode, chain_code, depth, parent_fingerprint, child_index,
+          public_pair, secret_exponent=None):
+    """
+    Builds a :class:`BIP32Node` from an already computed public pair, so
+    that ``pycoin`` does not compute it again from the secret exponent.
+
+    """
+    node = BIP32Node(netcode=netcode, chain_code=chain_code, depth=depth,
+                     parent_fingerprint=parent_fingerprint,
+                     child_index=child_index, public_pair=public_pair)
+    if secret_exponent is not None:
+        _with_secret(node, secret_exponent)
+    return node
+
+
+def _with_secret(node, secret_exponent):
+    """
+    Adds the private key ``secret_exponent`` to the public node ``node``,
+    without computing its public pair again.
+
+    Returns:
+        BIP32Node: ``node``
+
+    """
+    node._secret_exponent = secret_exponent
+    node._secret_exponent_bytes = to_bytes_32(secret_exponent)
+    return node
+
+
+class Backend(object):
+    """
+    Base class of the backends. Subclasses implement :meth:`public_pair`
+    and :meth:`add`, from which derivation and signing are implemented.
+
+    Attributes:
+        name (str): Name of the backend.
+
+    """
+    name = None
+
+    def public_pair(self, secret_exponent):
+        """
+        Args:
+            secret_exponent (int): Private key.
+
+        Returns:
+            tuple: ``(x, y)`` coordinates of ``secret_exponent * G``.
+
+        """
+        raise NotImplementedError
+
+    def add(self, public_pair, exponent):
+        """
+        Args:
+            public_pair (tuple): ``(x, y)`` coordinates of a point.
+            exponent (int): Scalar.
+
+        Returns:
+            tuple: ``(x, y)`` coordinates of
+            ``public_pair + exponent * G``.
+
+        Raises:
+            DerivationError: If the result is the point at infinity.
+
+        """
+        raise NotImplementedError
+
+    def from_master_secret(self, master_secret, netcode='BTC'):
+        """
+        Args:
+            master_secret (bytes): Master secret of the wallet.
+            netcode (str): ``'BTC'`` or ``'XTN'``. Defaults to ``'BTC'``.
+
+        Returns:
+            BIP32Node: Master node of the wallet.
+
+        """
+        I64 = hmac.new(b'Bitcoin seed', master_secret,
+                       hashlib.sha512).digest()
+        secret_exponent = from_bytes_32(I64[:32])
+        return _node(netcode, I64[32:], 0, b'\0\0\0\0', 0,
+                     self.public_pair(secret_exponent), secret_exponent)
+
+    def subkey(self, node, i, is_hardened, as_private):
+        """
+        Derives a child node, as :meth:`BIP32Node.subkey` does.
+
+        Args:
+            node (BIP32Node): Parent node.
+            i (int): Index of the child.
+            is_hardened (bool): Whether to use hardened derivation.
+            as_private (bool): Whether the child keeps its private key.
+
+        Returns:
+            BIP32Node: Child node.
+
+        """
+        if i < 0:
+            raise ValueError("i can't be negative")
+        if i >= 0x80000000:
+            raise ValueError('subkey index 0x%x too large' % i)
+        if is_hardened:
+            i |= 0x80000000
+        secret_exponent = node.secret_exponent()
+        public_pair = node.public_pair()
+
+        if is_hardened:
+            if secret_exponent is None:
+                raise PublicPrivateMismatchError(
+                    "can't derive a private key from a public key")
+            data = b'\0' + to_bytes_32(secret_exponent)
+        else:
+            data = public_pair_to_sec(public_pair, compressed=True)
+        I64 = hmac.new(node.chain_code(), data + struct.pack('>L', i),
+                       hashlib.sha512).digest()
+        exponent = from_bytes_32(I64[:32])
+        if exponent >= ORDER:
+            raise DerivationError('I_L >= {}'.format(ORDER))
+
+        if secret_exponent is None:
+            child_secret_exponent = None
+            child_public_pair = self.add(public_pair, exponent)
+        else:
+            child_secret_exponent = (exponent + secret_exponent) % ORDER
+            if child_secret_exponent == 0:
+                raise DerivationError('k_{} == 0'.format(i))
+            child_public_pair = self.public_pair(child_secret_exponent)
+        return _node(node.netcode(), I64[32:], node.tree_depth() + 1,
+                     node.fingerprint(), i, child_public_pair,
+                     child_secret_exponent if as_private else None)
+
+    def sign(self, msghash, privkey):
+        """
+        Signs a message hash, as :func:`bitcoin.ecdsa_raw_sign` does.
+
+        Args:
+            msghash (bytes): Hash of the message.
+            privkey (str): Private key, in any ``pybitcointools`` format.
+
+        Returns:
+            tuple: ``(v, r, s)``
+
+        """
+        z = bitcoin.hash_to_int(msghash)
+        k = bitcoin.deterministic_generate_k(msghash, privkey)
+        r, y = self.public_pair(k)
+        s = bitcoin.inv(k, bitcoin.N) * (
+            z + r * bitcoin.decode_privkey(privkey)) % bitcoin.N
+        v = 27 + ((y % 2) ^ (0 if s * 2 < bitcoin.N else 1))
+        if s * 2 >= bitcoin.N:
+            s = bitcoin.N - s
+        if 'compressed' in bitcoin.get_privkey_format(privkey):
+            v += 4
+        return v, r, s
+
+    def signall(self, tx, privkey):
+        """
+        Signs all the inputs of a transaction, as :func:`bitcoin.signall`
+        does.
+
+        Args:
+            tx (str): Hex encoded transaction.
+            privkey (str): Private key of the inputs, in any
+                ``pybitcointools`` format, e.g. wif.
+
+        Returns:
+            str: Hex encoded signed transaction.
+
+        """
+        fmt = bitcoin.get_privkey_format(privkey)
+        pub = bitcoin.encode_pubkey(
+            self.public_pair(bitcoin.decode_privkey(privkey, fmt)),
+            fmt.replace('wif', 'hex'))
+        script = bitcoin.mk_pubkey_script(bitcoin.pubkey_to_address(pub))
+        for i in range(len(bitcoin.deserialize(tx)['ins'])):
+            signing_tx = bitcoin.signature_form(tx, i, script,
+                                                bitcoin.SIGHASH_ALL)
+            rawsig = self.sign(
+                bitcoin.bin_txhash(signing_tx, bitcoin.SIGHASH_ALL), privkey)
+            sig = (bitcoin.der_encode_sig(*rawsig) +
+                   bitcoin.encode(bitcoin.SIGHASH_ALL, 16, 2))
+            txobj = bitcoin.deserialize(tx)
+            txobj['ins'][i]['script'] = bitcoin.serialize_script([sig, pub])
+            tx = bitcoin.serialize(txobj)
+        return tx
+
+
+class PycoinBackend(Backend):
+    """
+    Pure python backend. Derivation and signing are delegated to
+    ``pycoin`` and ``pybitcointools``.
+
+    """
+    name = 'pycoin'
+
+    def public_pair(self, secret_exponent):
+        return ecdsa.public_pair_for_secret_exponent(
+            ecdsa.generator_secp256k1, secret_exponent)
+
+    def add(self, public_pair, exponent):
+        point = exponent * ecdsa.generator_secp256k1 + ecdsa.Point(
+            ecdsa.generator_secp256k1.curve(), public_pair[0],
+            public_pair[1], ORDER)
+        if point == ecdsa.ellipticcurve.INFINITY:
+            raise DerivationError('point at infinity')
+        return point.pair()
+
+    def from_master_secret(self, master_secret, netcode='BTC'):
+        return BIP32Node.from_master_secret(master_secret, netcode=netcode)
+
+    def subkey(self, node, i, is_hardened, as_private):
+        if hasattr(node, '_subkey_cache'):
+            # some versions of pycoin, including the one pinned in
+            # requirements.txt, keep every child ever derived in an
+            # unbounded cache of the parent node. Bypass it so that memory
+            # is only held by the NodeCache of the wallet. This relies on
+            # the private BIP32Node._subkey of these versions, which other
+            # versions may lack: they go through the public subkey.
+            return node._subkey(i, is_hardened, as_private)
+        return node.subkey(i, is_hardened=is_hardened, as_private=as_private)
+
+    def sign(self, msghash, privkey):
+        return bitcoin.ecdsa_raw_sign(msghash, privkey)
+
+    def signall(self, tx, privkey):
+        return bitcoin.signall(tx, privkey)
+
+
+class Secp256k1Backend(Backend):
+    """
+    Native backend, based on ``libsecp256k1`` through the ``coincurve``
+    package.
+
+    """
+    name = 'secp256k1'
+
+    def __init__(self):
+        if coincurve is None:
+            raise ImportError('The secp256k1 backend requires coincurve')
+
+    def public_pair(self, secret_exponent):
+        return coincurve.PublicKey.from_secret(
+            to_bytes_32(secret_exponent)).point()
+
+    def add(self, public_pair, exponent):
+        try:
+            return coincurve.PublicKey.from_point(*public_pair).add(
+                to_bytes_32(exponent)).point()
+        except ValueError as e:
+            raise DerivationError(str(e))
+
+
+def default_backend():
+    """
+    Returns:
+        Backend: A :class:`Secp256k1Backend` if ``coincurve`` is
+        installed, or else a :class:`PycoinBackend`.
+
+    """
+    if coincurve is not None:
+        return Secp256k1Backend()
+    return PycoinBackend()
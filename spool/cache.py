@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent caches
+"""
+from __future__ import absolute_import, unicode_literals
+
+import os
+import sqlite3
+import threading
+from builtins import object, range
+
+
+def _stat_key(path, st=None):
+    """
+    Args:
+        path (str): Name of the file.
+        st (os.stat_result): Result of :func:`os.stat` for ``path``. If
+            ``None`` the file is stat'ed.
+
+    Returns:
+        tuple: ``(path, size, mtime_ns, inode)`` identifying the content
+        of the file.
+
+    """
+    st = st or os.stat(path)
+    # st_mtime_ns is not available on python 2
+    mtime_ns = getattr(st, 'st_mtime_ns', int(st.st_mtime * 10 ** 9))
+    return os.path.abspath(path), st.st_size, mtime_ns, st.st_ino
+
+
+class HashCache(object):
+    """
+    On-disk cache of the md5 digests of files, backed by SQLite.
+
+    Entries are keyed by ``(path, size, mtime_ns, inode)`` so that a file
+    whose content may have changed is never served from the cache.
+
+    Attributes:
+        FILENAME (str): Name of the database file.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups not found in the cache.
+
+    """
+    FILENAME = 'hashes.sqlite'
+
+    def __init__(self, directory):
+        """
+        Args:
+            directory (str): Directory where the cache is stored. It is
+                created if it does not exist.
+
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, self.FILENAME),
+                                     check_same_thread=False)
+        with self._conn:
+            self._conn.execute('CREATE TABLE IF NOT EXISTS hashes ('
+                               'path TEXT PRIMARY KEY, size INTEGER, '
+                               'mtime_ns INTEGER, inode INTEGER, md5 TEXT)')
+
+    def get(self, path, st=None):
+        """
+        Args:
+            path (str): Name of the file.
+            st (os.stat_result): Result of :func:`os.stat` for ``path``, if
+                already known.
+
+        Returns:
+            str: The cached md5 digest of the file or ``None`` if the file
+            is not in the cache or has changed since it was cached.
+
+        """
+        path, size, mtime_ns, inode = _stat_key(path, st)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT md5 FROM hashes WHERE path = ? AND size = ? AND '
+                'mtime_ns = ? AND inode = ?',
+                (path, size, mtime_ns, inode)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def set(self, path, md5, st=None):
+        """
+        Stores the md5 digest of a file.
+
+        Args:
+            path (str): Name of the file.
+            md5 (str): Hexadecimal md5 digest of the file.
+            st (os.stat_result): Result of :func:`os.stat` for ``path``
+                taken before the file was hashed.
+
+        """
+        key = _stat_key(path, st)
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO hashes VALUES '
+                               '(?, ?, ?, ?, ?)', key + (md5,))
+
+    def prune(self):
+        """
+        Removes the entries of files that no longer exist or have changed.
+
+        Returns:
+            int: Number of entries removed.
+
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT path, size, mtime_ns, inode FROM hashes').fetchall()
+        stale = []
+        for row in rows:
+            try:
+                current = _stat_key(row[0])
+            except OSError:
+                current = None
+            if current != tuple(row):
+                stale.append(tuple(row))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'DELETE FROM hashes WHERE path = ? AND size = ? AND '
+                'mtime_ns = ? AND inode = ?', stale)
+        return len(stale)
+
+    def close(self):
+        """
+        Closes the underlying database connection.
+
+        """
+        self._conn.close()
+
+
+# fields of the records of TransactionCache, as in the trees returned by
+# BlockchainSpider.history
+RECORD_FIELDS = ('txid', 'verb', 'from_address', 'to_address',
+                 'piece_address', 'timestamp_utc', 'action', 'edition_number',
+                 'number_editions')
+
+# maximum number of parameters of an SQLite statement
+_MAX_VARIABLES = 500
+
+
+class TransactionCache(object):
+    """
+    On-disk cache of decoded SPOOL transactions, backed by SQLite and keyed
+    by transaction id.
+
+    A transaction is only cached once it has enough confirmations to be
+    considered final, so that a cached record never changes.
+
+    Attributes:
+        FILENAME (str): Name of the database file.
+        min_confirmations (int): Number of confirmations a transaction
+            needs to be cached.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups not found in the cache.
+
+    """
+    FILENAME = 'transactions.sqlite'
+
+    def __init__(self, directory, min_confirmations=6):
+        """
+        Args:
+            directory (str): Directory where the cache is stored. It is
+                created if it does not exist.
+            min_confirmations (int): Number of confirmations a transaction
+                needs to be cached. Defaults to 6.
+
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.min_confirmations = min_confirmations
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, self.FILENAME),
+                                     check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS transactions ('
+                'txid TEXT PRIMARY KEY, verb BLOB, from_address TEXT, '
+                'to_address TEXT, piece_address TEXT, timestamp_utc, '
+                'action TEXT, edition_number, number_editions INTEGER, '
+                'confirmations INTEGER)')
+
+    def get(self, txid):
+        """
+        Args:
+            txid (str): Id of the transaction.
+
+        Returns:
+            dict: The cached record of the transaction, with the keys
+            :const:`RECORD_FIELDS`, or ``None`` if the transaction is not
+            cached.
+
+        """
+        return self.get_many([txid]).get(txid)
+
+    def get_many(self, txids):
+        """
+        Args:
+            txids (Iterable[str]): Ids of the transactions.
+
+        Returns:
+            dict: The cached records, by transaction id. Transactions not
+            cached are missing.
+
+        """
+        txids = list(txids)
+        records = {}
+        with self._lock:
+            for i in range(0, len(txids), _MAX_VARIABLES):
+                chunk = txids[i:i + _MAX_VARIABLES]
+                rows = self._conn.execute(
+                    'SELECT {} FROM transactions WHERE txid IN ({})'.format(
+                        ', '.join(RECORD_FIELDS), ', '.join('?' * len(chunk))),
+                    chunk)
+                for row in rows:
+                    record = dict(zip(RECORD_FIELDS, row))
+                    record['verb'] = bytes(record['verb'])
+                    records[record['txid']] = record
+            self.hits += len(records)
+            self.misses += len(txids) - len(records)
+        return records
+
+    def set(self, record, confirmations):
+        """
+        Stores the record of a transaction, if it has at least
+        :attr:`min_confirmations` confirmations.
+
+        Args:
+            record (dict): Record of the transaction, with the keys
+                :const:`RECORD_FIELDS`.
+            confirmations (int): Number of confirmations of the
+                transaction.
+
+        Returns:
+            bool: Whether the record was stored.
+
+        """
+        if confirmations < self.min_confirmations:
+            return False
+        values = [record[field] for field in RECORD_FIELDS]
+        values[RECORD_FIELDS.index('verb')] = sqlite3.Binary(record['verb'])
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO transactions ({}, confirmations) '
+                'VALUES ({})'.format(', '.join(RECORD_FIELDS),
+                                     ', '.join('?' * (len(values) + 1))),
+                values + [confirmations])
+        return True
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM transactions').fetchone()[0]
+
+    def close(self):
+        """
+        Closes the underlying database connection.
+
+        """
+        self._conn.close()
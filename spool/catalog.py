@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Catalog related methods
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import json
+import os
+import time
+from builtins import object
+from collections import namedtuple
+from fnmatch import fnmatch
+
+from .file import CHUNK_SIZE, File
+
+
+class Progress(namedtuple('Progress', ['files', 'bytes', 'elapsed'])):
+    """
+    Progress of a :class:`Catalog` run.
+
+    Attributes:
+        files (int): Number of files hashed so far.
+        bytes (int): Number of bytes hashed so far.
+        elapsed (float): Number of seconds since the start of the run.
+
+    """
+    __slots__ = ()
+
+    @property
+    def files_per_second(self):
+        """
+        float: Number of files hashed per second.
+
+        """
+        return self.files / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def mb_per_second(self):
+        """
+        float: Number of megabytes hashed per second.
+
+        """
+        return self.bytes / 2 ** 20 / self.elapsed if self.elapsed else 0.0
+
+
+class Catalog(object):
+    """
+    Hashes all the files of a directory tree and records their hashes in a
+    JSON-lines manifest, one line per file::
+
+        {"path": "scans/piece.tif", "size": 1024,
+         "file_hash": "1Fa1...", "file_hash_metadata": "1BZ2..."}
+
+    Files already recorded in the manifest are skipped, so that an
+    interrupted run can be resumed by running it again.
+
+    """
+
+    def __init__(self, root, manifest, include=('*',), exclude=(),
+                 metadata=None, testnet=False, workers=None,
+                 chunk_size=CHUNK_SIZE, cache=None):
+        """
+        Args:
+            root (str): Root directory of the catalog.
+            manifest (str): Name of the manifest file. It is created if it
+                does not exist and appended to otherwise.
+            include (Iterable[str]): :mod:`fnmatch` patterns, relative to
+                ``root``, of the files to hash. Defaults to all files.
+            exclude (Iterable[str]): :mod:`fnmatch` patterns, relative to
+                ``root``, of the files to skip. Defaults to ``()``.
+            metadata (dict): Mapping of file names, relative to ``root``,
+                to the metadata (``dict``) to be encoded with the file.
+                Defaults to ``None``.
+            testnet (bool): testnet flag. Defaults to False
+            workers (int): Number of worker processes. See
+                :meth:`File.hash_many`.
+            chunk_size (int): See :class:`File`.
+            cache (HashCache): See :meth:`File.hash_many`.
+
+        """
+        self.root = root
+        self.manifest = manifest
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+        self.metadata = metadata or {}
+        self.testnet = testnet
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.cache = cache
+
+    def paths(self):
+        """
+        Walks :attr:`root` in a deterministic order.
+
+        Yields:
+            str: Name of each file matching :attr:`include` and not
+            matching :attr:`exclude`, relative to :attr:`root`.
+
+        """
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                relpath = os.path.relpath(os.path.join(dirpath, filename),
+                                          self.root)
+                if (any(fnmatch(relpath, p) for p in self.include) and
+                        not any(fnmatch(relpath, p) for p in self.exclude)):
+                    yield relpath
+
+    def done(self):
+        """
+        Reads the manifest. An incomplete last line, left by an interrupted
+        run, is discarded from the manifest.
+
+        Returns:
+            dict: Records of the manifest, by file name relative to
+            :attr:`root`.
+
+        """
+        records = {}
+        if not os.path.exists(self.manifest):
+            return records
+        with open(self.manifest, 'rb+') as f:
+            end = 0
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                record = json.loads(line.decode('utf-8'))
+                records[record['path']] = record
+                end += len(line)
+            f.truncate(end)
+        return records
+
+    def run(self, progress=None, progress_interval=1.0):
+        """
+        Hashes the files not yet recorded in the manifest.
+
+        Args:
+            progress (callable): Called with a :class:`Progress` instance
+                at most every ``progress_interval`` seconds, and once
+                when the run completes. Defaults to ``None``.
+            progress_interval (float): Defaults to one second.
+
+        Returns:
+            :class:`Progress`: Totals of the run.
+
+        """
+        done = self.done()
+        pending = {}
+        for relpath in self.paths():
+            if relpath not in done:
+                pending[os.path.join(self.root, relpath)] = relpath
+        metadata = dict((path, self.metadata[relpath])
+                        for path, relpath in pending.items()
+                        if relpath in self.metadata)
+
+        start = last_report = time.time()
+        files = nbytes = 0
+        with open(self.manifest, 'ab') as manifest:
+            for path, file_hash, file_hash_metadata in File.hash_many(
+                    sorted(pending), metadata=metadata, workers=self.workers,
+                    testnet=self.testnet, chunk_size=self.chunk_size,
+                    cache=self.cache):
+                size = os.path.getsize(path)
+                record = {'path': pending[path],
+                          'size': size,
+                          'file_hash': file_hash,
+                          'file_hash_metadata': file_hash_metadata}
+                manifest.write((json.dumps(record) + '\n').encode('utf-8'))
+                manifest.flush()
+                files += 1
+                nbytes += size
+                now = time.time()
+                if progress and now - last_report >= progress_interval:
+                    progress(Progress(files, nbytes, now - start))
+                    last_report = now
+
+        totals = Progress(files, nbytes, time.time() - start)
+        if progress:
+            progress(totals)
+        return totals
@@ -5,7 +5,14 @@ File related methods
 from __future__ import unicode_literals
 
 import hashlib
+import mmap
+import os
+import stat
 from builtins import object, str, super
+from collections import namedtuple
+from contextlib import closing
+from functools import partial
+from multiprocessing import Pool
 
 
 from bitcoin import bin_hash160, bin_to_b58check
@@ -19,6 +26,31 @@ class ExplicitUnicodeLiteral(str):
 
 urepr = ExplicitUnicodeLiteral
 
+# number of bytes read at a time when hashing a file
+CHUNK_SIZE = 64 * 1024
+
+
+class PieceHash(namedtuple('PieceHash', ['file_hash', 'file_hash_metadata'])):
+    """
+    Immutable and hashable ``(file_hash, file_hash_metadata)`` pair, as
+    expected by the :class:`~spool.Spool` methods. Instances have no
+    ``__dict__`` and are as cheap to keep in memory as a plain tuple.
+
+    Attributes:
+        file_hash (str): hash of the file
+        file_hash_metadata (str): hash of the file + metadata
+
+    """
+    __slots__ = ()
+
+    @property
+    def hash(self):
+        """
+        str: Alias of :attr:`file_hash`.
+
+        """
+        return self.file_hash
+
 
 class File(object):
 
@@ -27,11 +59,30 @@ class File(object):
     metadata to be included on the blockchain
 
     """
-    def __init__(self, filename, testnet=False, **kwargs):
+    def __init__(self, filename, testnet=False, chunk_size=CHUNK_SIZE,
+                 use_mmap=False, cache=None, algorithms=(), **kwargs):
         """
         Args:
-            filename (str): Name of the file
+            filename (str): Name of the file. A readable binary file-like
+                object (e.g. an upload stream) can be given instead, in
+                which case it is read until exhausted.
             testnet (bool): testnet flag. Defaults to False
+            chunk_size (int): Number of bytes read at a time when hashing
+                the file, so that memory usage stays constant regardless
+                of the size of the file. Defaults to :const:`CHUNK_SIZE`.
+            use_mmap (bool): Hash regular files through a read-only memory
+                map instead of reading them in chunks. Defaults to
+                :const:`False`.
+            cache (HashCache): :class:`~spool.cache.HashCache` used to
+                look up the md5 digest of the file before hashing it.
+                The cache is only read when no additional ``algorithms``
+                are requested. Defaults to ``None``.
+            algorithms (Iterable[str]): Names of additional
+                :mod:`hashlib` algorithms (e.g. ``'sha256'``,
+                ``'blake2b'``) computed in the same pass over the file.
+                The hexadecimal digests are available in :attr:`digests`
+                and as attributes named after the algorithm. Defaults to
+                ``()``.
             **kwargs: Additional metadata to be encoded with the file. Only
                 the values are used to compute the hash. Values are
                 ordered using their keys, so that the computation of the
@@ -49,20 +100,207 @@ class File(object):
         self.testnet = testnet
         # prefix of the addresses to distinguish between mainnet and testnet
         self._magicbyte = 111 if testnet else 0
+        self.chunk_size = chunk_size
+        self.use_mmap = use_mmap
+        self.cache = cache
+        self.algorithms = tuple(algorithms)
         self.file_hash, self.file_hash_metadata = self._calculate_hash(filename, **kwargs)
 
-    @classmethod
-    def from_hash(cls, hash):
+    @property
+    def piece_hash(self):
+        """
+        :class:`PieceHash`: hashes of the file, to be passed to the
+        :class:`~spool.Spool` methods.
+
+        """
+        return PieceHash(self.file_hash, self.file_hash_metadata)
+
+    @staticmethod
+    def from_hash(hash, hash_metadata=None):
         """
         Args:
             hash (str): hash of the file
+            hash_metadata (str): hash of the file + metadata. Defaults to
+                ``hash``, i.e. a file without metadata.
+
+        Returns:
+            :class:`PieceHash` instance
+
+        """
+        return PieceHash(hash, hash_metadata or hash)
+
+    @classmethod
+    def from_bytes(cls, data, testnet=False, algorithms=(), **kwargs):
+        """
+        Computes the hashes of a file whose content is already in memory.
+
+        Args:
+            data (bytes): Content of the file. Any object supporting the
+                buffer protocol (``bytearray``, ``memoryview``) is accepted
+                and hashed without being copied.
+            testnet (bool): testnet flag. Defaults to False
+            algorithms (Iterable[str]): See :class:`File`.
+            **kwargs: Additional metadata to be encoded with the file. See
+                :class:`File`.
+
+        Returns:
+            :class:`File` instance
+
+        """
+        hasher = FileHasher(algorithms=algorithms)
+        hasher.update(data)
+        return cls._from_digests(hasher.digests, testnet=testnet, **kwargs)
+
+    @classmethod
+    def from_digest(cls, md5, testnet=False, **kwargs):
+        """
+        Derives the hashes of a file whose md5 digest is already known,
+        without reading the file. Useful to recompute
+        :attr:`file_hash_metadata` when only the metadata changed.
+
+        Args:
+            md5 (str): hexadecimal md5 digest of the file, e.g. as
+                available in :attr:`md5`.
+            testnet (bool): testnet flag. Defaults to False
+            **kwargs: Additional metadata to be encoded with the file. See
+                :class:`File`.
 
         Returns:
             :class:`File` instance
 
         """
-        cls.hash = hash
-        return cls
+        return cls._from_digests({'md5': md5}, testnet=testnet, **kwargs)
+
+    @classmethod
+    def derive_many(cls, records, testnet=False):
+        """
+        Derives the hashes of many files whose md5 digests are already
+        known, e.g. after a catalog wide metadata edit. The piece address
+        of a given digest is only derived once.
+
+        Args:
+            records (Iterable[tuple]): ``(md5, metadata)`` pairs, where
+                ``metadata`` is a ``dict`` of metadata to be encoded with
+                the file, as passed in the ``kwargs`` of :class:`File`.
+                The same digest may appear with several metadata variants.
+            testnet (bool): testnet flag. Defaults to False
+
+        Yields:
+            tuple: ``(file_hash, file_hash_metadata)`` for each record, in
+            order.
+
+        """
+        magicbyte = 111 if testnet else 0
+        piece_addresses = {}
+        for md5, metadata in records:
+            if md5 not in piece_addresses:
+                piece_addresses[md5] = _address(md5, magicbyte)
+            address_piece = piece_addresses[md5]
+            if metadata:
+                yield address_piece, _address(_metadata_data(md5, metadata),
+                                              magicbyte)
+            else:
+                yield address_piece, address_piece
+
+    def with_metadata(self, **kwargs):
+        """
+        Args:
+            **kwargs: New metadata to be encoded with the file. See
+                :class:`File`.
+
+        Returns:
+            :class:`File`: A new instance for the same file content and
+            network, with ``kwargs`` as metadata. The file is not read.
+
+        """
+        return self._from_digests(self.digests, testnet=self.testnet,
+                                  **kwargs)
+
+    @classmethod
+    def _from_digests(cls, digests, testnet=False, **kwargs):
+        """
+        Args:
+            digests (dict): hexadecimal digests of the file, by algorithm
+                name. Must contain at least ``'md5'``.
+            testnet (bool): testnet flag. Defaults to False
+            **kwargs: Additional metadata to be encoded with the file. See
+                :class:`File`.
+
+        Returns:
+            :class:`File` instance for a file that is not read.
+
+        """
+        f = cls.__new__(cls)
+        f.testnet = testnet
+        f._magicbyte = 111 if testnet else 0
+        f.chunk_size = CHUNK_SIZE
+        f.use_mmap = False
+        f.cache = None
+        f.algorithms = tuple(name for name in digests if name != 'md5')
+        f._set_digests(digests)
+        f.file_hash, f.file_hash_metadata = _addresses(f.md5, f._magicbyte,
+                                                       **kwargs)
+        return f
+
+    @classmethod
+    def hash_many(cls, paths, metadata=None, workers=None, testnet=False,
+                  chunk_size=CHUNK_SIZE, use_mmap=False, cache=None):
+        """
+        Hashes many files over a pool of processes.
+
+        Args:
+            paths (Iterable[str]): Names of the files to hash.
+            metadata (dict): Mapping of file names to the metadata
+                (``dict``) to be encoded with the file, as passed in the
+                ``kwargs`` of :class:`File`. Files with no entry are hashed
+                without metadata. Defaults to ``None``.
+            workers (int): Number of worker processes. Defaults to the
+                number of cpus. If ``1`` the files are hashed in the
+                current process.
+            testnet (bool): testnet flag. Defaults to False
+            chunk_size (int): See :class:`File`.
+            use_mmap (bool): See :class:`File`.
+            cache (HashCache): :class:`~spool.cache.HashCache` consulted
+                before dispatching a file to the pool. Files found in the
+                cache are not read. Defaults to ``None``.
+
+        Yields:
+            tuple: ``(path, file_hash, file_hash_metadata)`` for each file,
+            in the order in which the files finish hashing.
+
+        """
+        metadata = metadata or {}
+        magicbyte = 111 if testnet else 0
+        stats = {}
+        tasks = []
+        for path in paths:
+            if cache is not None:
+                stats[path] = os.stat(path)
+                md5 = cache.get(path, stats[path])
+                if md5 is not None:
+                    yield (path,) + _addresses(md5, magicbyte,
+                                               **metadata.get(path, {}))
+                    continue
+            tasks.append((cls, path, dict(metadata.get(path, {}),
+                                          testnet=testnet,
+                                          chunk_size=chunk_size,
+                                          use_mmap=use_mmap)))
+
+        if workers == 1:
+            results = (_hash_file(task) for task in tasks)
+            pool = None
+        else:
+            pool = Pool(processes=workers)
+            results = pool.imap_unordered(_hash_file, tasks)
+        try:
+            for path, md5, file_hash, file_hash_metadata in results:
+                if cache is not None:
+                    cache.set(path, md5, stats[path])
+                yield path, file_hash, file_hash_metadata
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
 
     def _calculate_hash(self, filename, **kwargs):
         """
@@ -83,19 +321,199 @@ class File(object):
                 order for the computation of the hash.
 
         """
+        self._set_digests(self._digest(filename))
+        return _addresses(self.md5, self._magicbyte, **kwargs)
+
+    def _set_digests(self, digests):
+        """
+        Exposes the digests of the file in :attr:`digests` and as
+        attributes named after their algorithm (e.g. :attr:`md5`).
+
+        Args:
+            digests (dict): hexadecimal digests of the file, by algorithm
+                name.
+
+        """
+        self.digests = dict(digests)
+        for name, digest in digests.items():
+            setattr(self, name, digest)
+
+    def _digest(self, filename):
+        """
+        Computes the md5 digest of the file, and of the additional
+        :attr:`algorithms`, in a single pass without loading the file in
+        memory.
+
+        The file is either read in chunks of :attr:`chunk_size` bytes or,
+        if :attr:`use_mmap` is set and the file is a non empty regular
+        file, memory mapped. If a :attr:`cache` is set and holds the digest
+        of the file, the file is not read.
+
+        Args:
+            filename (str): Name of the file or readable file-like object.
+
+        Returns:
+            dict: hexadecimal digests of the file, by algorithm name.
+
+        """
+        hasher = FileHasher(algorithms=self.algorithms)
+        if hasattr(filename, 'read'):
+            for chunk in iter(partial(filename.read, self.chunk_size), b''):
+                hasher.update(chunk)
+            return hasher.digests
+
         with open(filename, 'rb') as f:
-            file_hash = hashlib.md5(f.read()).hexdigest()
+            st = os.fstat(f.fileno())
+            if self.cache is not None and not self.algorithms:
+                digest = self.cache.get(filename, st)
+                if digest is not None:
+                    return {'md5': digest}
+            if self.use_mmap and stat.S_ISREG(st.st_mode) and st.st_size:
+                with closing(mmap.mmap(f.fileno(), 0,
+                                       access=mmap.ACCESS_READ)) as m:
+                    hasher.update(m)
+            else:
+                for chunk in iter(partial(f.read, self.chunk_size), b''):
+                    hasher.update(chunk)
+        if self.cache is not None:
+            self.cache.set(filename, hasher.md5, st)
+        return hasher.digests
 
-        if kwargs:
-            data = str(
-                [urepr(kwargs[k]) for k in sorted(kwargs)] + [file_hash])
-        else:
-            data = file_hash
-
-        address_piece_with_metadata = str(
-            bin_to_b58check(bin_hash160(data.encode()),
-                            magicbyte=self._magicbyte)
-        )
-        address_piece = str(bin_to_b58check(bin_hash160(file_hash.encode()),
-                                            magicbyte=self._magicbyte))
-        return address_piece, address_piece_with_metadata
+
+class FileHasher(object):
+    """
+    Incrementally calculates the hash of a file and the hash of the file +
+    metadata, as the content of the file is fed to it. Useful to compute the
+    addresses of a piece while it is still being uploaded::
+
+        hasher = FileHasher(testnet=True, title='piece title')
+        for chunk in upload:
+            hasher.update(chunk)
+        hasher.file_hash, hasher.file_hash_metadata
+
+    """
+    def __init__(self, testnet=False, algorithms=(), **kwargs):
+        """
+        Args:
+            testnet (bool): testnet flag. Defaults to False
+            algorithms (Iterable[str]): Names of additional
+                :mod:`hashlib` algorithms to compute alongside md5.
+                Defaults to ``()``.
+            **kwargs: Additional metadata to be encoded with the file. See
+                :class:`File`.
+
+        """
+        self.testnet = testnet
+        self._magicbyte = 111 if testnet else 0
+        self._metadata = kwargs
+        self._hashes = dict((name, hashlib.new(name))
+                            for name in ('md5',) + tuple(algorithms))
+
+    def update(self, data):
+        """
+        Feeds the next piece of the content of the file.
+
+        Args:
+            data (bytes): ``bytes``, ``bytearray`` or ``memoryview``.
+
+        """
+        for h in self._hashes.values():
+            h.update(data)
+
+    @property
+    def digests(self):
+        """
+        dict: hexadecimal digests of the content fed so far, by algorithm
+        name.
+
+        """
+        return dict((name, h.hexdigest()) for name, h in self._hashes.items())
+
+    @property
+    def md5(self):
+        """
+        str: hexadecimal md5 digest of the content fed so far.
+
+        """
+        return self._hashes['md5'].hexdigest()
+
+    @property
+    def file_hash(self):
+        """
+        str: hash of the content fed so far.
+
+        """
+        return _addresses(self.md5, self._magicbyte)[0]
+
+    @property
+    def file_hash_metadata(self):
+        """
+        str: hash of the content fed so far + metadata.
+
+        """
+        return _addresses(self.md5, self._magicbyte, **self._metadata)[1]
+
+
+def _addresses(file_hash, magicbyte, **kwargs):
+    """
+    Derives the piece address and the piece + metadata address from the md5
+    digest of a file.
+
+    Args:
+        file_hash (str): hexadecimal md5 digest of the file
+        magicbyte (int): prefix of the addresses
+        **kwargs: Additional metadata to be encoded with the file. See
+            :class:`File`.
+
+    Returns:
+        tuple: ``(address_piece, address_piece_with_metadata)``
+
+    """
+    address_piece = _address(file_hash, magicbyte)
+    if not kwargs:
+        return address_piece, address_piece
+    return address_piece, _address(_metadata_data(file_hash, kwargs),
+                                   magicbyte)
+
+
+def _metadata_data(file_hash, metadata):
+    """
+    Args:
+        file_hash (str): hexadecimal md5 digest of the file
+        metadata (dict): Metadata to be encoded with the file.
+
+    Returns:
+        str: The data from which the piece + metadata address is derived.
+
+    """
+    return str([urepr(metadata[k]) for k in sorted(metadata)] + [file_hash])
+
+
+def _address(data, magicbyte):
+    """
+    Args:
+        data (str): Data to hash.
+        magicbyte (int): prefix of the address
+
+    Returns:
+        str: base58check encoded hash160 of ``data``.
+
+    """
+    return str(bin_to_b58check(bin_hash160(data.encode()),
+                               magicbyte=magicbyte))
+
+
+def _hash_file(task):
+    """
+    Worker for :meth:`File.hash_many`.
+
+    Args:
+        task (tuple): ``(cls, path, kwargs)``
+
+    Returns:
+        tuple: ``(path, md5, file_hash, file_hash_metadata)``
+
+    """
+    cls, path, kwargs = task
+    f = cls(path, **kwargs)
+    return path, f.md5, f.file_hash, f.file_hash_metadata
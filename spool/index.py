@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""
+Local index of the SPOOL transactions, built by scanning the blocks of a
+bitcoin node.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import binascii
+import sqlite3
+import threading
+from builtins import object, range
+
+from pycoin.block import Block
+from pycoin.networks import address_prefix_for_netcode
+
+from .cache import RECORD_FIELDS
+from .spoolex import BlockchainSpider, InvalidTransactionError
+from .spoolverb import SpoolverbError
+
+# prefix of the scripts of the outputs carrying a spoolverb: OP_RETURN,
+# followed by the push of the verb
+_OP_RETURN = b'\x6a'
+_META = b'ASCRIBESPOOL'
+# address returned by pycoin for the scripts it does not recognize
+_UNKNOWN = '(unknown)'
+
+
+def _is_spool(tx):
+    """
+    Returns:
+        bool: Whether one of the outputs of ``tx`` is an ``OP_RETURN``
+        carrying an ``ASCRIBESPOOL`` verb.
+
+    """
+    return any(tx_out.script[:1] == _OP_RETURN and
+               tx_out.script[2:2 + len(_META)] == _META
+               for tx_out in tx.txs_out)
+
+
+def _payload(tx, timestamp, netcode):
+    """
+    Args:
+        tx (Tx): Transaction, as parsed by :mod:`pycoin`.
+        timestamp (int): Unix timestamp of the block of the transaction.
+        netcode (str): ``'BTC'`` or ``'XTN'``.
+
+    Returns:
+        dict: Payload of the transaction, in the format of
+        :meth:`transactions.Transactions.get()`.
+
+    """
+    address_prefix = address_prefix_for_netcode(netcode)
+    return {'txid': tx.id(),
+            'time': timestamp,
+            'vins': [{'address': tx_in.address(address_prefix=address_prefix)}
+                     for tx_in in tx.txs_in],
+            'vouts': [{'n': n,
+                       'value': tx_out.coin_value,
+                       'address': _address(tx_out, netcode),
+                       'hex': binascii.hexlify(tx_out.script).decode('ascii')}
+                      for n, tx_out in enumerate(tx.txs_out)]}
+
+
+def _address(tx_out, netcode):
+    """
+    Returns:
+        str: Address paid by ``tx_out``, or ``None`` for an ``OP_RETURN``
+        or another non-standard output, e.g. a bare multisig, whose address
+        some versions of :mod:`pycoin` cannot compute.
+
+    """
+    if tx_out.script[:1] == _OP_RETURN:
+        return None
+    try:
+        address = tx_out.address(netcode=netcode)
+    except Exception:
+        # pycoin 0.76 raises a KeyError on the scripts it does not
+        # recognize, whereas later versions return '(unknown)'
+        return None
+    return None if address == _UNKNOWN else address
+
+
+class SpoolIndex(object):
+    """
+    Persistent index of SPOOL transactions, backed by SQLite, and keyed by
+    piece address, from address and to address.
+
+    The records are those of the trees returned by
+    :meth:`BlockchainSpider.history`. The hashes of the indexed blocks are
+    kept along with them, so that :class:`BlockScanner` can detect
+    reorganizations of the chain.
+
+    """
+
+    def __init__(self, filename):
+        """
+        Args:
+            filename (str): Name of the database file. It is created if it
+                does not exist.
+
+        """
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(filename, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS transactions ('
+                'txid TEXT PRIMARY KEY, verb BLOB, from_address TEXT, '
+                'to_address TEXT, piece_address TEXT, timestamp_utc, '
+                'action TEXT, edition_number, number_editions INTEGER, '
+                'height INTEGER, position INTEGER)')
+            for column in ('piece_address', 'from_address', 'to_address',
+                           'height'):
+                self._conn.execute(
+                    'CREATE INDEX IF NOT EXISTS transactions_{0} '
+                    'ON transactions ({0})'.format(column))
+            self._conn.execute('CREATE TABLE IF NOT EXISTS blocks ('
+                               'height INTEGER PRIMARY KEY, hash TEXT)')
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM transactions').fetchone()[0]
+
+    @property
+    def height(self):
+        """
+        int: Height of the last indexed block, or ``-1`` if no block is
+        indexed.
+
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT MAX(height) FROM blocks').fetchone()
+        return -1 if row[0] is None else row[0]
+
+    def block_hash(self, height):
+        """
+        Args:
+            height (int): Height of a block.
+
+        Returns:
+            str: Hash of the indexed block at ``height``, or ``None`` if it
+            is not indexed.
+
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT hash FROM blocks WHERE height = ?',
+                                     (height,)).fetchone()
+        return row[0] if row else None
+
+    def add_block(self, height, block_hash, records):
+        """
+        Indexes the SPOOL transactions of a block, in a single transaction.
+
+        Args:
+            height (int): Height of the block.
+            block_hash (str): Hash of the block.
+            records (list): Records of the SPOOL transactions of the block,
+                in the order of the block, with the keys
+                :const:`~spool.cache.RECORD_FIELDS`.
+
+        """
+        rows = []
+        for position, record in enumerate(records):
+            values = [record[field] for field in RECORD_FIELDS]
+            values[RECORD_FIELDS.index('verb')] = sqlite3.Binary(
+                record['verb'])
+            rows.append(values + [height, position])
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO blocks VALUES (?, ?)',
+                               (height, block_hash))
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO transactions ({}, height, position) '
+                'VALUES ({})'.format(', '.join(RECORD_FIELDS),
+                                     ', '.join('?' * (len(RECORD_FIELDS) + 2))),
+                rows)
+
+    def rewind(self, height):
+        """
+        Removes the blocks from ``height`` on, and their transactions.
+
+        Args:
+            height (int): Height of the first block to remove.
+
+        """
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM blocks WHERE height >= ?',
+                               (height,))
+            self._conn.execute('DELETE FROM transactions WHERE height >= ?',
+                               (height,))
+
+    def records(self, piece_address=None, from_address=None, to_address=None):
+        """
+        Args:
+            piece_address (str): Piece address of the transactions.
+            from_address (str): Sender address of the transactions.
+            to_address (str): Receiver address of the transactions.
+
+        Returns:
+            list: Records of the transactions matching all the given
+            addresses, in the order of the blockchain.
+
+        """
+        conditions = [(column, value) for column, value in (
+            ('piece_address', piece_address), ('from_address', from_address),
+            ('to_address', to_address)) if value is not None]
+        where = ' AND '.join('{} = ?'.format(column)
+                             for column, _ in conditions)
+        return self._select(where or '1',
+                            [value for _, value in conditions])
+
+    def received(self, address):
+        """
+        Args:
+            address (str): Bitcoin address, e.g. the hash of a file.
+
+        Returns:
+            list: Records of the transactions paying ``address``, either as
+            the piece address or as the receiver address, in the order of
+            the blockchain.
+
+        """
+        return self._select('piece_address = ? OR to_address = ?',
+                            (address, address))
+
+    def _select(self, where, parameters):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT {} FROM transactions WHERE {} '
+                'ORDER BY height, position'.format(', '.join(RECORD_FIELDS),
+                                                   where),
+                parameters).fetchall()
+        records = []
+        for row in rows:
+            record = dict(zip(RECORD_FIELDS, row))
+            record['verb'] = bytes(record['verb'])
+            records.append(record)
+        return records
+
+    def close(self):
+        """
+        Closes the underlying database connection.
+
+        """
+        self._conn.close()
+
+
+class BlockScanner(object):
+    """
+    Builds a :class:`SpoolIndex` by walking the blocks of a bitcoin node
+    over JSON-RPC::
+
+        index = SpoolIndex('spool.sqlite')
+        BlockScanner(index, AuthServiceProxy(rpcurl)).scan()
+        spider = BlockchainSpider(index=index)
+
+    Each block is retrieved serialized, in a single request, and only the
+    transactions with an ``ASCRIBESPOOL`` ``OP_RETURN`` are decoded. A scan
+    resumes after the last indexed block, and blocks no longer in the
+    chain of the node are removed from the index first.
+
+    """
+
+    def __init__(self, index, rpc, testnet=False):
+        """
+        Args:
+            index (SpoolIndex): Index to build.
+            rpc: JSON-RPC connection to the bitcoin node, e.g. an
+                :class:`bitcoinrpc.authproxy.AuthServiceProxy` instance.
+            testnet (bool): Whether the node runs on the testnet (or
+                regtest) or the mainnet. Defaults to the mainnet
+                (:const:`False`).
+
+        """
+        self.index = index
+        self.rpc = rpc
+        self.testnet = testnet
+        self._netcode = 'XTN' if testnet else 'BTC'
+
+    def scan(self, stop=None):
+        """
+        Indexes the blocks of the node, from the last indexed block.
+
+        Args:
+            stop (int): Height of the last block to index. Defaults to the
+                height of the chain of the node.
+
+        Returns:
+            int: Number of SPOOL transactions indexed.
+
+        """
+        tip = self.rpc.getblockcount()
+        stop = tip if stop is None else min(stop, tip)
+        count = 0
+        for height in range(self._start(tip), stop + 1):
+            block_hash = self.rpc.getblockhash(height)
+            block = Block.from_bin(
+                binascii.unhexlify(self.rpc.getblock(block_hash, False)))
+            records = self._records(block)
+            self.index.add_block(height, block_hash, records)
+            count += len(records)
+        return count
+
+    def _start(self, tip):
+        """
+        Rewinds the index to the last block it shares with the chain of the
+        node.
+
+        Returns:
+            int: Height of the first block to scan.
+
+        """
+        height = min(self.index.height, tip)
+        while (height >= 0 and
+               self.index.block_hash(height) != self.rpc.getblockhash(height)):
+            height -= 1
+        self.index.rewind(height + 1)
+        return height + 1
+
+    def _records(self, block):
+        """
+        Returns:
+            list: Records of the SPOOL transactions of ``block``, as
+            returned by :meth:`BlockchainSpider._record`.
+
+        """
+        records = []
+        for tx in block.txs:
+            if not _is_spool(tx):
+                continue
+            try:
+                records.append(BlockchainSpider._record(
+                    _payload(tx, block.timestamp, self._netcode)))
+            except (SpoolverbError, InvalidTransactionError):
+                # not a valid SPOOL transaction, e.g. an unsupported verb
+                # or inputs from several addresses, on which history fails
+                continue
+        return records
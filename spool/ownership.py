@@ -78,7 +78,12 @@ class Ownership(object):
         self.testnet = testnet
         self._bcs = BlockchainSpider(service=service, testnet=testnet, username=username,
                                      password=password, host=host, port=port)
-        self._tree = self._bcs.history(piece_address)
+        try:
+            self._tree = self._bcs.history(piece_address)
+        finally:
+            # the tree is all that is needed, so that the threads of the
+            # spider do not outlive the check
+            self._bcs.close()
         self.reason = ''
 
     @property
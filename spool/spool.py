@@ -10,10 +10,14 @@ from builtins import object, range
 from past.utils import old_div
 from queue import Queue
 
+from pycoin.encoding import EncodingError
+from pycoin.key.BIP32Node import BIP32Node
 from transactions import Transactions
 
-from .spoolverb import Spoolverb
+from .backend import default_backend
+from .spoolverb import Spoolverb, op_return_hex
 from .utils import dispatch
+from .wallet import Wallet
 
 
 class SpoolFundsError(Exception):
@@ -56,7 +60,8 @@ class Spool(object):
         - ``file_hash``: is the hash of the digital file
         - ``file_hash_metadata``: is the hash of the digital file + metadata
 
-    The hash is passed to the methods has a tuple: ``(file_hash, file_hash_metadata)``
+    The hash is passed to the methods has a tuple: ``(file_hash, file_hash_metadata)``,
+    e.g. a :class:`PieceHash` as returned by :attr:`File.piece_hash`.
 
     Attributes:
         FEE (int): transaction fee
@@ -69,7 +74,8 @@ class Spool(object):
     SPENTS_QUEUE_MAXSIZE = 50
 
     def __init__(self, testnet=False, service='blockr', username='',
-                 password='', host='', port='', fee=None, token=None):
+                 password='', host='', port='', fee=None, token=None,
+                 backend=None):
         """
         Args:
             testnet (bool): Whether to use the mainnet or testnet.
@@ -84,6 +90,9 @@ class Spool(object):
             port (str): port number of the bitcoin node when using jsonrpc
             fee (int): transaction fee
             token (int): token
+            backend (Backend): Elliptic curve backend deriving the keys
+                and signing the transactions. Defaults to
+                :func:`~spool.backend.default_backend`.
 
         """
         self.testnet = testnet
@@ -94,6 +103,7 @@ class Spool(object):
         self._spents = Queue(maxsize=self.SPENTS_QUEUE_MAXSIZE)
         self.fee = fee or self.FEE
         self.token = token or self.TOKEN
+        self.backend = backend or default_backend()
 
     @dispatch
     def register_piece(self, from_address, to_address, hash, password, min_confirmations=6, sync=False, ownership=True):
@@ -128,7 +138,7 @@ class Spool(object):
                                                     op_return=verb.piece,
                                                     min_confirmations=min_confirmations)
 
-        signed_tx = self._t.sign_transaction(unsigned_tx, password)
+        signed_tx = self._sign_transaction(unsigned_tx, password)
         txid = self._t.push(signed_tx)
         return txid
 
@@ -160,7 +170,7 @@ class Spool(object):
                                                     op_return=verb.register,
                                                     min_confirmations=min_confirmations)
 
-        signed_tx = self._t.sign_transaction(unsigned_tx, password)
+        signed_tx = self._sign_transaction(unsigned_tx, password)
         txid = self._t.push(signed_tx)
         return txid
 
@@ -191,7 +201,7 @@ class Spool(object):
                                                     op_return=verb.consigned_registration,
                                                     min_confirmations=min_confirmations)
 
-        signed_tx = self._t.sign_transaction(unsigned_tx, password)
+        signed_tx = self._sign_transaction(unsigned_tx, password)
         txid = self._t.push(signed_tx)
         return txid
 
@@ -223,7 +233,7 @@ class Spool(object):
                                                     op_return=verb.editions,
                                                     min_confirmations=min_confirmations)
 
-        signed_tx = self._t.sign_transaction(unsigned_tx, password)
+        signed_tx = self._sign_transaction(unsigned_tx, password)
         txid = self._t.push(signed_tx)
         return txid
 
@@ -254,7 +264,7 @@ class Spool(object):
                                                     [file_hash, to_address],
                                                     op_return=verb.transfer,
                                                     min_confirmations=min_confirmations)
-        signed_tx = self._t.sign_transaction(unsigned_tx, password, path=path)
+        signed_tx = self._sign_transaction(unsigned_tx, password, path=path)
         txid = self._t.push(signed_tx)
         return txid
 
@@ -285,7 +295,7 @@ class Spool(object):
                                                     [file_hash, to_address],
                                                     op_return=verb.consign,
                                                     min_confirmations=min_confirmations)
-        signed_tx = self._t.sign_transaction(unsigned_tx, password, path=path)
+        signed_tx = self._sign_transaction(unsigned_tx, password, path=path)
         txid = self._t.push(signed_tx)
         return txid
 
@@ -317,7 +327,7 @@ class Spool(object):
                                                     [file_hash, to_address],
                                                     op_return=verb.unconsign,
                                                     min_confirmations=min_confirmations)
-        signed_tx = self._t.sign_transaction(unsigned_tx, password, path=path)
+        signed_tx = self._sign_transaction(unsigned_tx, password, path=path)
         txid = self._t.push(signed_tx)
         return txid
 
@@ -350,7 +360,7 @@ class Spool(object):
                                                     [file_hash, to_address],
                                                     op_return=verb.loan,
                                                     min_confirmations=min_confirmations)
-        signed_tx = self._t.sign_transaction(unsigned_tx, password, path=path)
+        signed_tx = self._sign_transaction(unsigned_tx, password, path=path)
         txid = self._t.push(signed_tx)
         return txid
 
@@ -382,7 +392,7 @@ class Spool(object):
                                                     op_return=verb.migrate,
                                                     min_confirmations=min_confirmations)
 
-        signed_tx = self._t.sign_transaction(unsigned_tx, password)
+        signed_tx = self._sign_transaction(unsigned_tx, password)
         txid = self._t.push(signed_tx)
         return txid
 
@@ -412,7 +422,7 @@ class Spool(object):
                                                  [(to_address, self.fee)] * nfees + [(to_address, self.token)] * ntokens,
                                                  min_confirmations=min_confirmations)
 
-        signed_tx = self._t.sign_transaction(unsigned_tx, password)
+        signed_tx = self._sign_transaction(unsigned_tx, password)
         txid = self._t.push(signed_tx)
         return txid
 
@@ -442,9 +452,9 @@ class Spool(object):
         inputs = self.select_inputs(from_address, nfees + 1, ntokens, min_confirmations=min_confirmations)
         outputs = [{'address': to_address, 'value': self.token}] * ntokens
         outputs += [{'address': to_address, 'value': self.fee}] * nfees
-        outputs += [{'script': self._t._op_return_hex(verb.fuel), 'value': 0}]
+        outputs += [{'script': op_return_hex(verb.fuel), 'value': 0}]
         unsigned_tx = self._t.build_transaction(inputs, outputs)
-        signed_tx = self._t.sign_transaction(unsigned_tx, password, path=path)
+        signed_tx = self._sign_transaction(unsigned_tx, password, path=path)
         txid = self._t.push(signed_tx)
         return txid
 
@@ -469,11 +479,35 @@ class Spool(object):
         inputs = self.select_inputs(from_address, nfees, ntokens, min_confirmations=min_confirmations)
         # outputs
         outputs = [{'address': to_address, 'value': self.token} for to_address in to]
-        outputs += [{'script': self._t._op_return_hex(op_return), 'value': 0}]
+        outputs += [{'script': op_return_hex(op_return), 'value': 0}]
         # build transaction
         unsigned_tx = self._t.build_transaction(inputs, outputs)
         return unsigned_tx
 
+    def _sign_transaction(self, tx, password, path=''):
+        """
+        Signs a transaction with :attr:`backend`, as
+        :meth:`Transactions.sign_transaction` does.
+
+        Args:
+            tx (str): hex transaction to sign
+            password (str): master secret of the BIP32 wallet, or wif
+            path (Optional[str]): path to the leaf address of the BIP32
+                wallet owning the inputs of the transaction
+
+        Returns:
+            str: signed transaction
+
+        """
+        try:
+            BIP32Node.from_text(password)
+            key = password
+        except (AttributeError, EncodingError):
+            wallet = Wallet(password, testnet=self.testnet, cache_size=0,
+                            backend=self.backend)
+            key = wallet.subkey_for_path(path).wif()
+        return self.backend.signall(tx, key)
+
     def select_inputs(self, address, nfees, ntokens, min_confirmations=6):
         """
         Selects the inputs for the spool transaction.
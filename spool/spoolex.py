@@ -5,8 +5,10 @@ from builtins import object
 
 import binascii
 import calendar
+import threading
 from collections import namedtuple, defaultdict
 from datetime import datetime
+from multiprocessing.pool import ThreadPool
 from pprint import PrettyPrinter
 
 from transactions import Transactions
@@ -49,7 +51,8 @@ class BlockchainSpider(object):
 
     """
 
-    def __init__(self, testnet=False, service='blockr', username='', password='', host='', port=''):
+    def __init__(self, testnet=False, service='blockr', username='', password='', host='', port='',
+                 max_workers=8, timeout=None, cache=None, index=None):
         """
         Args:
             testnet (bool): Whether to use the mainnet or testnet.
@@ -62,10 +65,37 @@ class BlockchainSpider(object):
             password (str): password for jsonrpc communications
             hostname (str): hostname of the bitcoin node when using jsonrpc
             port (str): port number of the bitcoin node when using jsonrpc
+            max_workers (int): Maximum number of transactions retrieved
+                concurrently by :meth:`history`. Defaults to 8. If ``1``
+                the transactions are retrieved one after the other. The
+                threads, and their connections to the bitcoin service, are
+                created on the first concurrent retrieval and reused until
+                :meth:`close` is called.
+            timeout (float): Maximum number of seconds to wait for each
+                transaction retrieved by :meth:`history`. Defaults to
+                ``None``, to wait for as long as it takes.
+            cache (TransactionCache): Cache of the confirmed transactions.
+                Cached transactions are not retrieved again by
+                :meth:`history`. Defaults to ``None``, to retrieve every
+                transaction.
+            index (SpoolIndex): Local index of the SPOOL transactions, built
+                by a :class:`BlockScanner`. If given, :meth:`history`,
+                :meth:`refresh` and :meth:`txids` are answered from the
+                index, without requests to the bitcoin service. Defaults to
+                ``None``.
 
         """
-        self._t = Transactions(service=service, testnet=testnet, username=username,
-                               password=password, host=host, port=port)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cache = cache
+        self.index = index
+        self._transactions_kwargs = dict(service=service, testnet=testnet, username=username,
+                                         password=password, host=host, port=port)
+        self._t = Transactions(**self._transactions_kwargs)
+        self._local = threading.local()
+        self._local.transactions = self._t
+        self._pool = None
+        self._pool_lock = threading.Lock()
 
     def history(self, hash):
         """
@@ -78,38 +108,247 @@ class BlockchainSpider(object):
         Returns:
             dict: Ownsership tree of all editions of a piece.
 
+        Raises:
+            multiprocessing.TimeoutError: If a transaction is not
+                retrieved within :attr:`timeout` seconds.
+
         .. note:: For now we only support searching the blockchain by
             the piece hash.
 
         """
-        txs = self._t.get(hash, max_transactions=10000)['transactions']
+        if self.index is not None:
+            return BlockchainSpider._tree_from_records(self.index.received(hash))
+        txs = self._transactions().get(hash, max_transactions=10000)['transactions']
+        txids = [tx['txid'] for tx in txs]
+        records = self._records(txids)
+        return BlockchainSpider._tree_from_records(records[txid] for txid in txids)
+
+    def refresh(self, hash, tree=None, watermark=None):
+        """
+        Brings the ownership tree of a piece up to date, retrieving only the
+        transactions that are not in the tree yet::
+
+            tree, watermark = spider.refresh(piece_address)
+            # later on
+            tree, watermark = spider.refresh(piece_address, tree, watermark)
+
+        Args:
+            hash (str): Hash of the file to check. Can be created with the
+                :class:`File` class
+            tree (dict): Ownership tree of the piece, as returned by
+                :meth:`history` or :meth:`refresh`. Defaults to ``None``,
+                to build the whole tree.
+            watermark (frozenset): Ids of the transactions merged into
+                ``tree``, as returned with it by :meth:`refresh`. Defaults
+                to the ids of the transactions of ``tree``.
+
+        Returns:
+            tuple: ``(tree, watermark)``, where ``tree`` is the updated
+            ownership tree, and ``watermark`` the ids of its
+            transactions. Only the listed transactions whose id is not in
+            the watermark are retrieved.
+
+            If :attr:`index` is set, the transactions are listed and
+            retrieved from the index instead.
+
+        .. note:: The transactions are not filtered by time since the
+            timestamps of the blocks are not monotonic: a block may be
+            older than its parent.
+
+        """
+        records = [d for chain in (tree or {}).values() for d in chain]
+        known = set(d['txid'] for d in records)
+        if watermark is not None:
+            known.update(watermark)
+        if self.index is not None:
+            listed = self.index.received(hash)
+            new_records = dict((d['txid'], d) for d in listed)
+            txids = [d['txid'] for d in listed if d['txid'] not in known]
+        else:
+            txs = self._transactions().get(hash, max_transactions=10000)['transactions']
+            txids = [tx['txid'] for tx in txs if tx['txid'] not in known]
+            new_records = self._records(txids)
+        records.extend(new_records[txid] for txid in txids)
+        known.update(txids)
+        return BlockchainSpider._tree_from_records(records), frozenset(known)
+
+    def _records(self, txids):
+        """
+        Retrieves and decodes transactions, from :attr:`cache` when
+        possible.
+
+        Args:
+            txids (list): Ids of the transactions.
+
+        Returns:
+            dict: Records of the transactions, as returned by
+            :meth:`_record`, by transaction id.
+
+        """
+        records = self.cache.get_many(txids) if self.cache is not None else {}
+        missing = [txid for txid in txids if txid not in records]
+        for txid, tx in zip(missing, self._get_transactions(missing)):
+            records[txid] = record = BlockchainSpider._record(tx)
+            if self.cache is not None:
+                # unconfirmed transactions may have '' confirmations
+                self.cache.set(record, tx.get('confirmations') or 0)
+        return records
+
+    def _get_transactions(self, txids):
+        """
+        Retrieves transactions over a pool of at most :attr:`max_workers`
+        threads.
+
+        Args:
+            txids (list): Ids of the transactions.
+
+        Returns:
+            list: Transaction payloads, in the order of ``txids``.
+
+        """
+        if self.max_workers == 1 or len(txids) < 2:
+            transactions = self._transactions()
+            return [transactions.get(txid) for txid in txids]
+        cancelled = threading.Event()
+        pool = self._thread_pool()
+        results = [pool.apply_async(self._get_transaction, (txid, cancelled))
+                   for txid in txids]
+        try:
+            return [result.get(self.timeout) for result in results]
+        except Exception:
+            # the pending requests are skipped, but a request in progress
+            # cannot be interrupted
+            cancelled.set()
+            raise
+
+    def _thread_pool(self):
+        """
+        Returns:
+            ThreadPool: Pool of :attr:`max_workers` threads of
+            :meth:`_get_transactions`, created on the first call.
+
+        """
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPool(self.max_workers)
+            return self._pool
+
+    def close(self):
+        """
+        Stops the threads retrieving the transactions. A request in
+        progress is not interrupted. The spider can still be used, and
+        creates new threads if needed.
+
+        """
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+
+    def __del__(self):
+        # the pool is not terminated here since the spider may be
+        # collected in one of its threads
+        pool = getattr(self, '_pool', None)
+        if pool is not None:
+            pool.close()
+
+    def _get_transaction(self, txid, cancelled):
+        """
+        Runs in a thread of :meth:`_get_transactions`.
+
+        Returns:
+            dict: Transaction payload, or ``None`` if ``cancelled`` is set.
+
+        """
+        if cancelled.is_set():
+            return None
+        return self._transactions().get(txid)
+
+    def _transactions(self):
+        """
+        Returns:
+            Transactions: :class:`Transactions` instance of the current
+            thread, since the connection of the jsonrpc services cannot be
+            shared between threads.
+
+        """
+        transactions = getattr(self._local, 'transactions', None)
+        if transactions is None:
+            transactions = self._local.transactions = Transactions(**self._transactions_kwargs)
+        return transactions
+
+    @staticmethod
+    def _record(tx):
+        """
+        Decodes a SPOOL transaction into a record of the ownership tree.
+
+        Args:
+            tx (dict): Transaction payload, as returned by
+                :meth:`transactions.Transactions.get()`.
+
+        Returns:
+            dict: Record of the transaction. ``number_editions`` is only
+            set for an ``EDITIONS`` transaction, and is ``0`` otherwise.
+
+        """
+        verb_str = BlockchainSpider.check_script(tx['vouts'])
+        verb = Spoolverb.from_verb(verb_str)
+        from_address, to_address, piece_address = BlockchainSpider._get_addresses(tx)
+        action = verb.action
+
+        edition_number = 0
+        number_editions = 0
+        if action != 'EDITIONS':
+            edition_number = verb.edition_number
+        else:
+            number_editions = verb.num_editions
+
+        return {'txid': tx['txid'],
+                'verb': verb_str,
+                'from_address': from_address,
+                'to_address': to_address,
+                'piece_address': piece_address,
+                'timestamp_utc': tx['time'],
+                'action': action,
+                'number_editions': number_editions,
+                'edition_number': edition_number}
+
+    @staticmethod
+    def _tree(txs):
+        """
+        Builds the ownership tree of a piece.
+
+        Args:
+            txs (list): Payloads of the transactions of the piece, as
+                returned by :meth:`transactions.Transactions.get()`.
+
+        Returns:
+            dict: Ownsership tree of all editions of a piece.
+
+        """
+        return BlockchainSpider._tree_from_records([BlockchainSpider._record(tx) for tx in txs])
+
+    @staticmethod
+    def _tree_from_records(records):
+        """
+        Builds the ownership tree of a piece.
+
+        Args:
+            records (Iterable[dict]): Records of the transactions of the
+                piece, as returned by :meth:`_record`.
+
+        Returns:
+            dict: Ownsership tree of all editions of a piece.
+
+        """
         tree = defaultdict(list)
         number_editions = 0
 
-        for tx in txs:
-            _tx = self._t.get(tx['txid'])
-            txid = _tx['txid']
-            verb_str = BlockchainSpider.check_script(_tx['vouts'])
-            verb = Spoolverb.from_verb(verb_str)
-            from_address, to_address, piece_address = BlockchainSpider._get_addresses(_tx)
-            timestamp_utc = _tx['time']
-            action = verb.action
-
-            edition_number = 0
-            if action != 'EDITIONS':
-                edition_number = verb.edition_number
-            else:
-                number_editions = verb.num_editions
-
-            tree[edition_number].append({'txid': txid,
-                                         'verb': verb_str,
-                                         'from_address': from_address,
-                                         'to_address': to_address,
-                                         'piece_address': piece_address,
-                                         'timestamp_utc': timestamp_utc,
-                                         'action': action,
-                                         'number_editions': number_editions,
-                                         'edition_number': edition_number})
+        for record in records:
+            if record['action'] == 'EDITIONS':
+                number_editions = record['number_editions']
+            # copied, since the records of the cache are shared between trees
+            tree[record['edition_number']].append(dict(record))
 
         # lets update the records with the number of editions of the piece since we do not know
         # this information before the EDITIONS transaction
@@ -117,6 +356,23 @@ class BlockchainSpider(object):
             [d.update({'number_editions': number_editions}) for d in chain]
         return dict(tree)
 
+    def txids(self, address):
+        """
+        Lists the transactions of an address, without retrieving them.
+
+        Args:
+            address (str): Bitcoin address, e.g. the hash of a file.
+
+        Returns:
+            list: Ids of the transactions of the address. If :attr:`index`
+            is set, only the SPOOL transactions are listed, from the index.
+
+        """
+        if self.index is not None:
+            return [d['txid'] for d in self.index.received(address)]
+        txs = self._transactions().get(address, max_transactions=10000)['transactions']
+        return [tx['txid'] for tx in txs]
+
     @staticmethod
     def chain(tree, edition_number):
         """
@@ -194,7 +450,7 @@ class BlockchainSpider(object):
             str: String representation of the ``op_return``.
 
         Raises:
-            Exception: If no ``vout`` having a supported
+            InvalidTransactionError: If no ``vout`` having a supported
                 verb (:attr:`supported_actions`) is found.
 
         """
@@ -203,7 +459,7 @@ class BlockchainSpider(object):
             action = Spoolverb.from_verb(verb).action
             if action in Spoolverb.supported_actions:
                 return verb
-        raise Exception("Invalid ascribe transaction")
+        raise InvalidTransactionError("Invalid ascribe transaction")
 
     @staticmethod
     def _get_addresses(tx):
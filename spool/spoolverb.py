@@ -2,9 +2,80 @@
 
 from __future__ import unicode_literals
 
-from builtins import object
-
+import codecs
 import re
+from collections import namedtuple
+
+_VERB_REGEX = re.compile(r'^([A-Z]+)(\d+)([A-Z]+)(\d+)?(?:/(\d+))?$')
+
+# actions of the verbs with no edition number
+_NO_EDITION_ACTIONS = frozenset(['FUEL', 'PIECE', 'CONSIGNEDREGISTRATION'])
+
+# format of the arguments following the action of each verb
+_ARGUMENTS = {
+    'PIECE': '',
+    'REGISTER': '{0.edition_number}',
+    'EDITIONS': '{0.num_editions}',
+    'TRANSFER': '{0.edition_number}',
+    'CONSIGN': '{0.edition_number}',
+    'UNCONSIGN': '{0.edition_number}',
+    'LOAN': '{0.edition_number}/{0.loan_start}{0.loan_end}',
+    'MIGRATE': '{0.edition_number}',
+    'CONSIGNEDREGISTRATION': '',
+    'FUEL': '',
+}
+
+# maximum number of entries of the caches of representations of verbs and
+# of op_return scripts
+VERB_CACHE_SIZE = 4096
+
+# meta + version prefixes, shared by all the verbs
+_prefixes = {}
+
+# representations of the verbs by (action, Spoolverb instance)
+_verbs = {}
+
+# op_return scripts by representation of the verb
+_op_return_hexes = {}
+
+
+def _prefix(meta, version):
+    """
+    Returns:
+        str: The single shared instance of the ``meta + version`` prefix.
+
+    """
+    try:
+        return _prefixes[meta, version]
+    except KeyError:
+        return _prefixes.setdefault((meta, version), meta + version)
+
+
+def op_return_hex(verb):
+    """
+    Encodes a verb as the hex script of an ``op_return`` output, as
+    :meth:`transactions.Transactions._op_return_hex` does. The scripts are
+    cached (see :const:`VERB_CACHE_SIZE`), so that the script of recurring
+    verbs such as ``FUEL`` or ``PIECE`` is built once per process.
+
+    Args:
+        verb (str): representation of the verb, e.g.
+            ``'ASCRIBESPOOL01FUEL'``.
+
+    Returns:
+        str: hex encoded script.
+
+    """
+    try:
+        return _op_return_hexes[verb]
+    except KeyError:
+        pass
+    data = verb if isinstance(verb, bytes) else verb.encode('utf-8')
+    script = '6a%x%s' % (len(verb), codecs.encode(data, 'hex').decode('ascii'))
+    if len(_op_return_hexes) >= VERB_CACHE_SIZE:
+        _op_return_hexes.clear()
+    _op_return_hexes[verb] = script
+    return script
 
 
 class SpoolverbError(Exception):
@@ -28,21 +99,58 @@ class SpoolverbError(Exception):
         return self.message
 
 
-class Spoolverb(object):
+def _parse(verb):
+    """
+    Parses a verb with the precompiled pattern.
+
+    Args:
+        verb (str): representation of the verb, as ``str`` or
+            :obj:`bytes`.
+
+    Returns:
+        tuple: ``(meta, version, action, arg1, arg2)``, as ``str``.
+        ``arg1`` and ``arg2`` may be ``None``.
+
+    Raises:
+        SpoolverbError: If the verb is invalid.
+
+    """
+    if isinstance(verb, bytes):
+        # valid verbs are ascii, and decoding the whole verb at once is
+        # cheaper than decoding the groups of a bytes pattern
+        try:
+            verb = verb.decode('ascii')
+        except UnicodeDecodeError:
+            raise SpoolverbError('Invalid spoolverb: {}'.format(
+                verb.decode('utf-8', 'replace')))
+    match = _VERB_REGEX.match(verb)
+    if not match:
+        raise SpoolverbError('Invalid spoolverb: {}'.format(verb))
+    return match.groups()
+
+
+class Spoolverb(namedtuple('Spoolverb', [
+        'meta', 'version', 'num_editions', 'edition_number', 'loan_start',
+        'loan_end', 'action'])):
     """
     Allows for easy creation of the verb to be encoded on the
     ``op_return`` of all SPOOL transactions.
 
+    Instances are immutable values. The representations of the verbs are
+    cached per process, see :const:`VERB_CACHE_SIZE`.
+
     Attributes:
         supported_actions (List[str]): Actions supported by the SPOOL
             protocol.
 
     """
+    __slots__ = ()
+
     supported_actions = ['REGISTER', 'CONSIGN', 'TRANSFER', 'LOAN', 'UNCONSIGN',
                          'FUEL', 'EDITIONS', 'PIECE', 'MIGRATE', 'CONSIGNEDREGISTRATION']
 
-    def __init__(self, num_editions=None, edition_num=None, loan_start='',
-                 loan_end='', meta='ASCRIBESPOOL', version='01', action=None):
+    def __new__(cls, num_editions=None, edition_num=None, loan_start='',
+                loan_end='', meta='ASCRIBESPOOL', version='01', action=None):
         """
         Initializer for the Spoolverb class.
 
@@ -60,13 +168,38 @@ class Spoolverb(object):
             :class:`Spoolverb` instance.
 
         """
-        self.meta = meta
-        self.version = version
-        self.num_editions = num_editions
-        self.edition_number = edition_num if edition_num else ''
-        self.loan_start = loan_start
-        self.loan_end = loan_end
-        self.action = action
+        return super(Spoolverb, cls).__new__(
+            cls, meta, version, num_editions,
+            edition_num if edition_num else '', loan_start, loan_end, action)
+
+    def __getnewargs__(self):
+        """
+        Returns:
+            tuple: Arguments of :meth:`__new__` rebuilding the instance,
+            used by :mod:`pickle` and :mod:`copy`. The order of the
+            arguments of :meth:`__new__` differs from the order of the
+            fields.
+
+        """
+        return (self.num_editions, self.edition_number, self.loan_start,
+                self.loan_end, self.meta, self.version, self.action)
+
+    def _verb(self, action):
+        """
+        Returns:
+            str: representation of the ``action`` spoolverb, built on the
+            first call only.
+
+        """
+        key = action, self
+        verb = _verbs.get(key)
+        if verb is None:
+            verb = (_prefix(self.meta, self.version) + action +
+                    _ARGUMENTS[action].format(self))
+            if len(_verbs) >= VERB_CACHE_SIZE:
+                _verbs.clear()
+            _verbs[key] = verb
+        return verb
 
     @classmethod
     def from_verb(cls, verb):
@@ -82,39 +215,81 @@ class Spoolverb(object):
         Returns:
             :class:`Spoolverb` instance.
 
+        Raises:
+            SpoolverbError: If the verb is invalid, or lacks an argument
+                required by its action.
+
         """
-        pattern = r'^(?P<meta>[A-Z]+)(?P<version>\d+)(?P<action>[A-Z]+)(?P<arg1>\d+)?(\/(?P<arg2>\d+))?$'
-        try:
-            verb = verb.decode()
-        except AttributeError:
-            pass
-        match = re.match(pattern, verb)
-        if not match:
-            raise SpoolverbError('Invalid spoolverb: {}'.format(verb))
-
-        data = match.groupdict()
-        meta = data['meta']
-        version = data['version']
-        action = data['action']
+        return cls._from_groups(*_parse(verb))
+
+    @classmethod
+    def decode_many(cls, verbs, strict=True):
+        """
+        Constructs :class:`Spoolverb` instances from many verbs, e.g. the
+        ``op_return`` of all the transactions of a piece. Each distinct
+        verb is decoded once, and equal verbs share the same instance.
+
+        Args:
+            verbs (Iterable): representations of the verbs, as ``str`` or
+                :obj:`bytes`. See :meth:`from_verb`.
+            strict (bool): Whether to raise :exc:`SpoolverbError` on an
+                invalid verb. If ``False``, invalid verbs are decoded as
+                ``None``. Defaults to ``True``.
+
+        Returns:
+            list: :class:`Spoolverb` instances, in the order of ``verbs``.
+
+        """
+        decoded = {}
+        spoolverbs = []
+        for verb in verbs:
+            try:
+                spoolverb = decoded[verb]
+            except KeyError:
+                try:
+                    spoolverb = cls.from_verb(verb)
+                except SpoolverbError:
+                    if strict:
+                        raise
+                    spoolverb = None
+                decoded[verb] = spoolverb
+            spoolverbs.append(spoolverb)
+        return spoolverbs
+
+    @classmethod
+    def _from_groups(cls, meta, version, action, arg1, arg2):
+        """
+        Constructs a :class:`Spoolverb` instance from the groups of a
+        parsed verb.
+
+        Raises:
+            SpoolverbError: If an argument required by the action is
+                missing.
+
+        """
+        if action == 'LOAN':
+            # the loan dates are required, the edition number is not
+            missing = arg2 is None
+        else:
+            missing = arg1 is None and action not in _NO_EDITION_ACTIONS
+        if missing:
+            raise SpoolverbError('Invalid spoolverb: {}{}{}{}'.format(
+                meta, version, action, arg1 or ''))
         if action == 'EDITIONS':
-            num_editions = data['arg1']
-            return cls(meta=meta, version=version, action=action, num_editions=int(num_editions))
+            return cls(meta=meta, version=version, action=action, num_editions=int(arg1))
         elif action == 'LOAN':
             # TODO Review. Workaround for piece loans
             try:
-                edition_num = int(data['arg1'])
+                edition_num = int(arg1)
             except TypeError:
                 edition_num = 0
-            loan_start = data['arg2'][:6]
-            loan_end = data['arg2'][6:]
-            return cls(meta=meta, version=version, action=action, edition_num=int(edition_num),
-                       loan_start=loan_start, loan_end=loan_end)
-        elif action in ['FUEL', 'PIECE', 'CONSIGNEDREGISTRATION']:
+            return cls(meta=meta, version=version, action=action, edition_num=edition_num,
+                       loan_start=arg2[:6], loan_end=arg2[6:])
+        elif action in _NO_EDITION_ACTIONS:
             # no edition number for these verbs
             return cls(meta=meta, version=version, action=action)
         else:
-            edition_num = data['arg1']
-            return cls(meta=meta, version=version, action=action, edition_num=int(edition_num))
+            return cls(meta=meta, version=version, action=action, edition_num=int(arg1))
 
     @property
     def piece(self):
@@ -122,7 +297,7 @@ class Spoolverb(object):
         str: representation of the ``PIECE`` spoolverb. E.g.:
             ``'ASCRIBESPOOL01PIECE'``.
         """
-        return '{}{}PIECE'.format(self.meta, self.version)
+        return self._verb('PIECE')
 
     @property
     def register(self):
@@ -130,7 +305,7 @@ class Spoolverb(object):
         str: representation of the ``REGISTER`` spoolverb. E.g.:
             ``'ASCRIBESPOOL01REGISTER1'```.
         """
-        return '{}{}REGISTER{}'.format(self.meta, self.version, self.edition_number)
+        return self._verb('REGISTER')
 
     @property
     def editions(self):
@@ -138,7 +313,7 @@ class Spoolverb(object):
         str: representation of the ``EDITIONS`` spoolverb. E.g.:
             ``'ASCRIBESPOOL01EDITIONS10'``.
         """
-        return '{}{}EDITIONS{}'.format(self.meta, self.version, self.num_editions)
+        return self._verb('EDITIONS')
 
     @property
     def transfer(self):
@@ -146,7 +321,7 @@ class Spoolverb(object):
         str: representation of the ``TRANSFER`` spoolverb. E.g.:
             ``'ASCRIBESPOOL01TRANSFER1'``.
         """
-        return '{}{}TRANSFER{}'.format(self.meta, self.version, self.edition_number)
+        return self._verb('TRANSFER')
 
     @property
     def consign(self):
@@ -154,7 +329,7 @@ class Spoolverb(object):
         str: representation of the ``CONSIGN`` spoolverb. E.g.:
             ``'ASCRIBESPOOL01CONSIGN1'``.
         """
-        return '{}{}CONSIGN{}'.format(self.meta, self.version, self.edition_number)
+        return self._verb('CONSIGN')
 
     @property
     def unconsign(self):
@@ -162,7 +337,7 @@ class Spoolverb(object):
         str: representation of the ``UNCONSIGN`` spoolverb. E.g.:
             ``'ASCRIBESPOOL01UNCONSIGN1'``.
         """
-        return '{}{}UNCONSIGN{}'.format(self.meta, self.version, self.edition_number)
+        return self._verb('UNCONSIGN')
 
     @property
     def loan(self):
@@ -170,8 +345,7 @@ class Spoolverb(object):
         str: representation of the ``LOAN`` spoolverb. E.g.:
             ``'ASCRIBESPOOL01LOAN1/150526150528'``.
         """
-        return '{}{}LOAN{}/{}{}'.format(self.meta, self.version, self.edition_number,
-                                        self.loan_start, self.loan_end)
+        return self._verb('LOAN')
 
     @property
     def migrate(self):
@@ -179,7 +353,7 @@ class Spoolverb(object):
         str: representation of the ``MIGRATE`` spoolverb. E.g.:
             ``'ASCRIBESPOOL01MIGRATE1'``.
         """
-        return '{}{}MIGRATE{}'.format(self.meta, self.version, self.edition_number)
+        return self._verb('MIGRATE')
 
     @property
     def consigned_registration(self):
@@ -187,7 +361,7 @@ class Spoolverb(object):
         str: representation of the ``CONSIGNEDREGISTRATION`` spoolverb. E.g.:
             ``'ASCRIBESPOOL01CONSIGNEDREGISTRATION'``.
         """
-        return '{}{}CONSIGNEDREGISTRATION'.format(self.meta, self.version)
+        return self._verb('CONSIGNEDREGISTRATION')
 
     @property
     def fuel(self):
@@ -195,4 +369,4 @@ class Spoolverb(object):
         str: representation of the ``FUEL`` spoolverb. E.g.:
             ``'ASCRIBESPOOL01FUEL'``.
         """
-        return '{}{}FUEL'.format(self.meta, self.version)
+        return self._verb('FUEL')
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Verification of local files against the blockchain
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import time
+from builtins import object
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+
+from .file import CHUNK_SIZE, File
+from .spoolex import BlockchainSpider
+
+
+class VerificationReport(namedtuple('VerificationReport', [
+        'registered', 'unregistered', 'mismatched', 'elapsed'])):
+    """
+    Result of :meth:`Verifier.verify`. Each file is listed as a
+    ``(path, file_hash, file_hash_metadata)`` tuple.
+
+    Attributes:
+        registered (list): Files whose hash and hash + metadata are both
+            registered.
+        unregistered (list): Files whose hash is not registered.
+        mismatched (list): Files whose hash is registered but whose
+            hash + metadata is not, i.e. registered with other metadata.
+        elapsed (float): Number of seconds the verification took.
+
+    """
+    __slots__ = ()
+
+    @property
+    def files(self):
+        """
+        int: Number of files verified.
+
+        """
+        return (len(self.registered) + len(self.unregistered) +
+                len(self.mismatched))
+
+    @property
+    def files_per_second(self):
+        """
+        float: Number of files verified per second.
+
+        """
+        return self.files / self.elapsed if self.elapsed else 0.0
+
+
+class Verifier(object):
+    """
+    Verifies that local files are registered in the blockchain.
+
+    Files are hashed over a pool of processes (see
+    :meth:`File.hash_many`) and, as soon as a file is hashed, its
+    registration is looked up by a pool of threads, so that disk and
+    network work overlap.
+
+    """
+
+    def __init__(self, spider=None, testnet=False, workers=None,
+                 lookup_workers=8, chunk_size=CHUNK_SIZE, cache=None):
+        """
+        Args:
+            spider (BlockchainSpider): :class:`BlockchainSpider` used to
+                look up the registrations. Defaults to a
+                :class:`BlockchainSpider` for ``testnet``.
+            testnet (bool): testnet flag. Defaults to False
+            workers (int): Number of hashing processes. See
+                :meth:`File.hash_many`.
+            lookup_workers (int): Number of concurrent lookups. Defaults
+                to 8.
+            chunk_size (int): See :class:`File`.
+            cache (HashCache): See :meth:`File.hash_many`.
+
+        """
+        self.spider = spider or BlockchainSpider(testnet=testnet)
+        self.testnet = testnet
+        self.workers = workers
+        self.lookup_workers = lookup_workers
+        self.chunk_size = chunk_size
+        self.cache = cache
+
+    def verify(self, paths, metadata=None):
+        """
+        Args:
+            paths (Iterable[str]): Names of the files to verify.
+            metadata (dict): Mapping of file names to the metadata
+                (``dict``) the files were registered with. See
+                :meth:`File.hash_many`.
+
+        Returns:
+            :class:`VerificationReport`
+
+        """
+        start = time.time()
+        pool = ThreadPool(self.lookup_workers)
+        try:
+            lookups = [pool.apply_async(self._lookup, result)
+                       for result in File.hash_many(
+                           paths, metadata=metadata, workers=self.workers,
+                           testnet=self.testnet, chunk_size=self.chunk_size,
+                           cache=self.cache)]
+            results = [lookup.get() for lookup in lookups]
+        finally:
+            pool.terminate()
+            pool.join()
+
+        report = {'registered': [], 'unregistered': [], 'mismatched': []}
+        for status, record in results:
+            report[status].append(record)
+        return VerificationReport(elapsed=time.time() - start, **report)
+
+    def _lookup(self, path, file_hash, file_hash_metadata):
+        """
+        Returns:
+            tuple: ``(status, (path, file_hash, file_hash_metadata))``
+            where ``status`` is one of ``'registered'``,
+            ``'unregistered'`` or ``'mismatched'``.
+
+        """
+        record = path, file_hash, file_hash_metadata
+        if not self.spider.txids(file_hash):
+            return 'unregistered', record
+        if (file_hash_metadata != file_hash and
+                not self.spider.txids(file_hash_metadata)):
+            return 'mismatched', record
+        return 'registered', record
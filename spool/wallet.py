@@ -4,11 +4,505 @@ Wallet related methods
 """
 from __future__ import unicode_literals
 
-from builtins import object, str
+import io
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from builtins import object, range, str
+from collections import OrderedDict, deque
 from datetime import datetime
+from itertools import count, islice
+from multiprocessing import Pool
 
+from pycoin.encoding import a2b_hashed_base58, from_bytes_32
 from pycoin.key.BIP32Node import BIP32Node
 
+from .backend import _with_secret, default_backend
+
+# default maximum number of derived nodes kept in memory by a wallet
+NODE_CACHE_SIZE = 4096
+
+# number of paths sent at a time to a worker process by Wallet.derive_many
+DERIVE_CHUNK_SIZE = 1000
+
+# source of the random component of the default PathAllocator prefixes,
+# seeded by the operating system rather than by the time
+_random = random.SystemRandom()
+
+# serializes the read-modify-write of the snapshot files
+_snapshot_lock = threading.Lock()
+
+
+def _subkey(node, component, backend):
+    """
+    Derives the child of ``node`` for one component of a path.
+
+    Args:
+        node (BIP32Node): Parent node.
+        component (str): Component of a path, e.g. ``'5'`` or ``'1H'``.
+            Use ``H``, ``p`` or ``'`` for hardened derivation.
+        backend (Backend): Elliptic curve backend deriving the child.
+
+    Returns:
+        BIP32Node: Child node.
+
+    """
+    is_hardened = component[-1] in "'pH"
+    i = int(component[:-1] if is_hardened else component)
+    as_private = node.secret_exponent() is not None
+    return backend.subkey(node, i, is_hardened, as_private)
+
+
+def _derive_addresses(root, paths, backend):
+    """
+    Derives the addresses of ``paths``, walking them as a prefix tree.
+
+    Args:
+        root (BIP32Node): Master node of the wallet.
+        paths (Iterable[str]): Paths for the HD wallet.
+        backend (Backend): Elliptic curve backend deriving the nodes.
+
+    Returns:
+        list: ``(path, address)`` tuples, in the order of ``paths``.
+
+    """
+    paths = list(paths)
+    addresses = {}
+    # nodes[i] is the node of the first i + 1 components of branch,
+    # the components of the previous path
+    branch, nodes = [], []
+    for path in sorted(set(paths), key=lambda p: p.split('/')):
+        if not path or path.endswith('.pub'):
+            addresses[path] = root.subkey_for_path(path).address()
+            continue
+        components = path.split('/')
+        common = 0
+        while (common < min(len(branch), len(components)) and
+               branch[common] == components[common]):
+            common += 1
+        del nodes[common:]
+        node = nodes[-1] if nodes else root
+        for component in components[common:]:
+            node = _subkey(node, component, backend)
+            nodes.append(node)
+        branch = components
+        addresses[path] = node.address()
+    return [(path, addresses[path]) for path in paths]
+
+
+def _chunks(iterable, size):
+    """
+    Yields:
+        list: Consecutive chunks of at most ``size`` items of
+        ``iterable``.
+
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+# master node and backend of the worker processes of Wallet.derive_many
+_worker = {}
+
+
+def _init_worker(hwif, backend):
+    """
+    Initializer of the worker processes of :meth:`Wallet.derive_many`.
+
+    Args:
+        hwif (str): Serialized extended key of the master node.
+        backend (Backend): Elliptic curve backend deriving the nodes.
+
+    """
+    _worker['root'] = BIP32Node.from_hwif(hwif)
+    _worker['backend'] = backend
+
+
+def _derive_chunk(paths):
+    """
+    Worker for :meth:`Wallet.derive_many`.
+
+    Args:
+        paths (list): Paths for the HD wallet.
+
+    Returns:
+        list: ``(path, address)`` tuples, in the order of ``paths``.
+
+    """
+    return _derive_addresses(_worker['root'], paths, _worker['backend'])
+
+
+def _read_snapshots(filename):
+    """
+    Returns:
+        dict: Snapshots of :meth:`Wallet.save_snapshot`, by root address,
+        or an empty ``dict`` if the file does not exist.
+
+    """
+    if not os.path.exists(filename):
+        return {}
+    with io.open(filename, 'rb') as f:
+        return json.loads(f.read().decode('utf-8'))
+
+
+def _write_snapshots(filename, snapshots):
+    """
+    Atomically replaces ``filename`` with ``snapshots``: they are written
+    to a temporary file of the same directory, readable by its owner
+    only, which is then renamed over ``filename``.
+
+    """
+    fd, tmp = tempfile.mkstemp(
+        prefix='.snapshot-', dir=os.path.dirname(os.path.abspath(filename)))
+    try:
+        if hasattr(os, 'fchmod'):
+            os.fchmod(fd, 0o600)
+        with io.open(fd, 'wb') as f:
+            f.write(json.dumps(snapshots).encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        # os.replace is not available on python 2, where os.rename
+        # replaces the target on posix systems
+        getattr(os, 'replace', os.rename)(tmp, filename)
+        tmp = None
+    finally:
+        if tmp is not None:
+            os.remove(tmp)
+
+
+class NodeCache(object):
+    """
+    Thread safe, bounded, least recently used cache of derived BIP32 nodes,
+    keyed by path.
+
+    Attributes:
+        maxsize (int): Maximum number of nodes kept in the cache.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups not found in the cache.
+
+    """
+
+    def __init__(self, maxsize=NODE_CACHE_SIZE):
+        """
+        Args:
+            maxsize (int): Maximum number of nodes kept in the cache. A
+                node takes in the order of a kilobyte of memory. Defaults
+                to :const:`NODE_CACHE_SIZE`.
+
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._nodes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, path):
+        return path in self._nodes
+
+    def get(self, path, count=True):
+        """
+        Args:
+            path (str): Path of the node.
+            count (bool): Whether to count the lookup in :attr:`hits` and
+                :attr:`misses`. Defaults to ``True``.
+
+        Returns:
+            BIP32Node: The cached node or ``None``.
+
+        """
+        with self._lock:
+            node = self._nodes.pop(path, None)
+            if node is not None:
+                # move to the most recently used end
+                self._nodes[path] = node
+            if count:
+                if node is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            return node
+
+    def set(self, path, node):
+        """
+        Caches a node, evicting the least recently used nodes if the cache
+        is full.
+
+        Args:
+            path (str): Path of the node.
+            node (BIP32Node): Derived node.
+
+        """
+        with self._lock:
+            self._nodes.pop(path, None)
+            self._nodes[path] = node
+            while len(self._nodes) > self.maxsize:
+                self._nodes.popitem(last=False)
+
+    def items(self):
+        """
+        Returns:
+            list: ``(path, node)`` tuples, from the least to the most
+            recently used.
+
+        """
+        with self._lock:
+            return list(self._nodes.items())
+
+    def clear(self):
+        """
+        Removes all the nodes from the cache and resets the statistics.
+
+        """
+        with self._lock:
+            self._nodes.clear()
+            self.hits = self.misses = 0
+
+
+class PathAllocator(object):
+    """
+    Allocates unique, shallow paths of the form ``'<prefix>/<n>'``, where
+    ``n`` is a counter incremented on every allocation. Allocations are
+    thread safe.
+
+    Compared to the time based paths of :class:`Wallet`, all the paths of
+    an allocator share the same parent node, so that once the parent is
+    derived, a new address costs a single child derivation.
+
+    Attributes:
+        prefix (str): Path of the parent node of the allocated paths.
+
+    """
+    # non hardened child indexes are below 2 ** 31
+    MAX_INDEX = 2 ** 31 - 1
+
+    def __init__(self, prefix=None, start=0):
+        """
+        Args:
+            prefix (str): Path of the parent node of the allocated paths,
+                e.g. ``'7'`` or ``'7/1'``. Its depth sets the depth of the
+                allocated paths. Defaults to
+                ``'<minutes>/<microseconds>/<random>'``: the time at which
+                the allocator is created, in minutes since the unix epoch
+                and microseconds since the start of the minute, followed by
+                31 random bits, so that allocators created at the same
+                time, e.g. by processes started together, or within the
+                resolution of a coarse clock, still allocate different
+                paths. Minutes, unlike seconds, stay below
+                :attr:`MAX_INDEX` until the year 6053.
+            start (int): First value of the counter. Defaults to 0.
+
+        Raises:
+            ValueError: If a component of ``prefix`` is not a valid child
+                index.
+
+        """
+        if prefix is None:
+            microseconds = int(time.time() * 10 ** 6)
+            prefix = '%d/%d/%d' % (divmod(microseconds, 60 * 10 ** 6) +
+                                   (_random.getrandbits(31),))
+        for component in prefix.split('/'):
+            is_hardened = component[-1:] in ("'", 'p', 'H')
+            index = component[:-1] if is_hardened else component
+            if not index.isdigit() or int(index) > self.MAX_INDEX:
+                raise ValueError(
+                    'Invalid path component {!r} in prefix {!r}'.format(
+                        component, prefix))
+        self.prefix = prefix
+        self._counter = count(start)
+        self._lock = threading.Lock()
+
+    def next(self):
+        """
+        Returns:
+            str: A path never returned before by this allocator.
+
+        Raises:
+            OverflowError: When the counter exceeds :attr:`MAX_INDEX`.
+
+        """
+        with self._lock:
+            n = next(self._counter)
+        if n > self.MAX_INDEX:
+            raise OverflowError('No more paths under {}'.format(self.prefix))
+        return '{}/{}'.format(self.prefix, n)
+
+
+class AddressPool(object):
+    """
+    Pool of ``(path, address)`` pairs for new unique paths, derived ahead
+    of time by a background thread so that handing one out costs no
+    derivation. The pool is refilled up to :attr:`size` addresses whenever
+    it drops to :attr:`low_watermark` addresses.
+
+    Attributes:
+        size (int): Number of addresses the pool is filled up to.
+        low_watermark (int): Number of addresses left in the pool below
+            which it is refilled.
+
+    """
+
+    def __init__(self, wallet, size=100, low_watermark=None):
+        """
+        Args:
+            wallet (Wallet): Wallet deriving the addresses.
+            size (int): Number of addresses the pool is filled up to.
+                Defaults to 100.
+            low_watermark (int): Number of addresses left in the pool
+                below which it is refilled. Defaults to a quarter of
+                ``size``.
+
+        Raises:
+            ValueError: If ``low_watermark`` is not in ``[0, size)``.
+
+        """
+        self.size = size
+        if low_watermark is None:
+            low_watermark = size // 4
+        if not 0 <= low_watermark < size:
+            raise ValueError('low_watermark must be in [0, {}), got {}'.format(
+                size, low_watermark))
+        self.low_watermark = low_watermark
+        self._wallet = wallet
+        self._addresses = deque()
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._fill)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __len__(self):
+        return len(self._addresses)
+
+    def get(self):
+        """
+        Returns:
+            tuple: A ``(path, address)`` pair, or ``None`` if the pool is
+            empty.
+
+        """
+        with self._condition:
+            address = self._addresses.popleft() if self._addresses else None
+            if len(self._addresses) <= self.low_watermark:
+                self._condition.notify()
+        return address
+
+    def stop(self):
+        """
+        Stops the background thread.
+
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _fill(self):
+        while True:
+            with self._condition:
+                while (not self._stopped and
+                       len(self._addresses) > self.low_watermark):
+                    self._condition.wait()
+                missing = self.size - len(self._addresses)
+            for _ in range(missing):
+                if self._stopped:
+                    return
+                # derived outside of the lock so that get() never waits
+                address = self._wallet.address_from_path(
+                    self._wallet._unique_path())
+                with self._condition:
+                    self._addresses.append(address)
+            if self._stopped:
+                return
+
+
+class AddressIndex(object):
+    """
+    Persistent index of leaf addresses to their derivation path, backed by
+    SQLite. Lookups go through the primary key of the table.
+
+    Every entry is committed before :meth:`add` or :meth:`update` returns,
+    so that an address handed out by :class:`Wallet` can always be mapped
+    back to its path: the unique paths of the wallet cannot be recovered
+    from their addresses. Use :meth:`update` to load many entries in a
+    single transaction.
+
+    """
+
+    def __init__(self, filename):
+        """
+        Args:
+            filename (str): Name of the database file. It is created if it
+                does not exist.
+
+        """
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(filename, check_same_thread=False)
+        with self._conn:
+            self._conn.execute('CREATE TABLE IF NOT EXISTS addresses ('
+                               'address TEXT PRIMARY KEY, path TEXT) '
+                               'WITHOUT ROWID')
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM addresses').fetchone()[0]
+
+    def add(self, path, address):
+        """
+        Args:
+            path (str): Derivation path of ``address``.
+            address (str): Leaf address.
+
+        """
+        self.update([(path, address)])
+
+    def update(self, addresses):
+        """
+        Bulk loads entries in a single transaction.
+
+        Args:
+            addresses (Iterable[tuple]): ``(path, address)`` pairs, as
+                returned by :meth:`Wallet.addresses_for_paths`.
+
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO addresses (path, address) '
+                'VALUES (?, ?)', addresses)
+
+    def lookup(self, address):
+        """
+        Args:
+            address (str): Leaf address.
+
+        Returns:
+            str: The derivation path of ``address``, or ``None`` if the
+            address is not indexed.
+
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT path FROM addresses WHERE address = ?',
+                (address,)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        """
+        Closes the database connection.
+
+        """
+        self._conn.close()
+
 
 class Wallet(object):
     """
@@ -17,10 +511,18 @@ class Wallet(object):
     Attributes:
         wallet (BIP32Node): :class:`BIP32NOde` instance.
         root_address (Tuple[str]): Root address of the HD Wallet.
+        nodes (NodeCache): Cache of the nodes derived by the wallet.
+        backend (Backend): Elliptic curve backend deriving the nodes.
+        path_allocator (PathAllocator): Allocator of unique paths, if any.
+        address_pool (AddressPool): Pool of pre-derived addresses, if
+            started with :meth:`start_address_pool`.
+        address_index (AddressIndex): Index of the derived addresses, if
+            any.
 
     """
 
-    def __init__(self, password, testnet=False):
+    def __init__(self, password, testnet=False, cache_size=NODE_CACHE_SIZE,
+                 path_allocator=None, address_index=None, backend=None):
         """
         Initializes a BIP32 wallet.
 
@@ -31,26 +533,268 @@ class Wallet(object):
                 also be passed as a string (``str``).
             testnet (bool): Wwether to use the bitcoin testnet or mainnet.
                 Defaults to ``False``.
+            cache_size (int): Maximum number of derived intermediate and
+                leaf nodes kept in memory. Defaults to
+                :const:`NODE_CACHE_SIZE`.
+            path_allocator (PathAllocator): Allocator of the unique paths
+                generated by :meth:`address_from_path`. Defaults to
+                ``None``, for unique paths based on time.
+            address_index (AddressIndex): Index in which every address
+                derived by the wallet is recorded, for
+                :meth:`path_for_address`. Defaults to ``None``.
+            backend (Backend): Elliptic curve backend deriving the nodes.
+                Defaults to :func:`~spool.backend.default_backend`.
 
         """
         netcode = 'XTN' if testnet else 'BTC'
         if isinstance(password, str):
             password = password.encode()
-        self.wallet = BIP32Node.from_master_secret(password, netcode=netcode)
+        self.backend = backend or default_backend()
+        self.wallet = self.backend.from_master_secret(password,
+                                                      netcode=netcode)
         self.root_address = ('', self.wallet.address())
+        self.nodes = NodeCache(cache_size)
+        self.path_allocator = path_allocator
+        self.address_pool = None
+        self.address_index = address_index
 
     def address_from_path(self, path=None):
         """
         Args:
             path (str): Path for the HD wallet. If path is ``None`` it
-                will generate a unique path based on time.
+                will generate a unique path, from :attr:`path_allocator`
+                if set, or else based on time. If the
+                :attr:`address_pool` is started, the address for the
+                unique path is taken from the pool.
 
         Returns:
             A ``tuple`` with the path and leaf address.
 
         """
-        path = path if path else self._unique_hierarchical_string()
-        return path, self.wallet.subkey_for_path(path).address()
+        if not path:
+            if self.address_pool is not None:
+                address = self.address_pool.get()
+                if address is not None:
+                    return address
+            path = self._unique_path()
+        address = self.subkey_for_path(path).address()
+        if self.address_index is not None:
+            self.address_index.add(path, address)
+        return path, address
+
+    def path_for_address(self, address):
+        """
+        Looks up the derivation path of an address in the
+        :attr:`address_index`.
+
+        Args:
+            address (str): Root or leaf address of the wallet.
+
+        Returns:
+            A ``tuple`` with the path and leaf address, or ``None`` if the
+            address is not indexed.
+
+        """
+        if address == self.root_address[1]:
+            return self.root_address
+        if self.address_index is None:
+            return None
+        path = self.address_index.lookup(address)
+        return None if path is None else (path, address)
+
+    def start_address_pool(self, size=100, low_watermark=None):
+        """
+        Starts deriving addresses for unique paths in the background. See
+        :class:`AddressPool`.
+
+        Args:
+            size (int): Number of addresses the pool is filled up to.
+                Defaults to 100.
+            low_watermark (int): Number of addresses left in the pool
+                below which it is refilled. Defaults to a quarter of
+                ``size``.
+
+        Raises:
+            ValueError: If ``low_watermark`` is not in ``[0, size)``.
+
+        """
+        self.stop_address_pool()
+        self.address_pool = AddressPool(self, size=size,
+                                        low_watermark=low_watermark)
+
+    def stop_address_pool(self):
+        """
+        Stops the :attr:`address_pool`, if started. The addresses left in
+        the pool are discarded.
+
+        """
+        if self.address_pool is not None:
+            self.address_pool.stop()
+            self.address_pool = None
+
+    def addresses_for_paths(self, paths):
+        """
+        Derives the addresses of many paths at once. The paths are walked
+        as a prefix tree, so that a node shared by several paths, such as
+        the ``'2014/2/23'`` prefix of the default time based paths, is
+        derived only once.
+
+        Args:
+            paths (Iterable[str]): Paths for the HD wallet.
+
+        Returns:
+            list: ``(path, address)`` tuples, in the order of ``paths``.
+
+        """
+        addresses = _derive_addresses(self.wallet, paths, self.backend)
+        if self.address_index is not None:
+            self.address_index.update(addresses)
+        return addresses
+
+    def derive_many(self, paths, workers=None, chunk_size=DERIVE_CHUNK_SIZE):
+        """
+        Derives the addresses of many paths over a pool of processes.
+
+        The extended key of the wallet is serialized once per worker
+        process. The paths are split in chunks of ``chunk_size`` paths,
+        each derived as in :meth:`addresses_for_paths` by a worker, and
+        the results are streamed back in the order of ``paths``.
+
+        Args:
+            paths (Iterable[str]): Paths for the HD wallet.
+            workers (int): Number of worker processes. Defaults to the
+                number of cpus. If ``1`` the paths are derived in the
+                current process.
+            chunk_size (int): Number of paths sent to a worker at a time.
+                Defaults to :const:`DERIVE_CHUNK_SIZE`.
+
+        Yields:
+            tuple: ``(path, address)`` for each path, in the order of
+            ``paths``.
+
+        """
+        chunks = _chunks(paths, chunk_size)
+        if workers == 1:
+            results = (_derive_addresses(self.wallet, chunk, self.backend)
+                       for chunk in chunks)
+            pool = None
+        else:
+            as_private = self.wallet.secret_exponent() is not None
+            pool = Pool(processes=workers, initializer=_init_worker,
+                        initargs=(self.wallet.hwif(as_private=as_private),
+                                  self.backend))
+            results = pool.imap(_derive_chunk, chunks)
+        try:
+            for addresses in results:
+                if self.address_index is not None:
+                    self.address_index.update(addresses)
+                for address in addresses:
+                    yield address
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+    def subkey_for_path(self, path):
+        """
+        Derives the node for a path, starting from the deepest cached
+        ancestor of the node instead of the master node.
+
+        Args:
+            path (str): Path for the HD wallet, e.g. ``'0/1/2'``.
+
+        Returns:
+            BIP32Node: The node for ``path``.
+
+        """
+        if not path or path.endswith('.pub'):
+            return self.wallet.subkey_for_path(path)
+        node = self.nodes.get(path)
+        if node is not None:
+            return node
+
+        components = path.split('/')
+        depth = len(components) - 1
+        node = None
+        while depth and node is None:
+            node = self.nodes.get('/'.join(components[:depth]), count=False)
+            if node is None:
+                depth -= 1
+        if node is None:
+            node = self.wallet
+        for i in range(depth, len(components)):
+            node = _subkey(node, components[i], self.backend)
+            self.nodes.set('/'.join(components[:i + 1]), node)
+        return node
+
+    def save_snapshot(self, filename):
+        """
+        Saves the nodes of :attr:`nodes` to a snapshot file, from which
+        another wallet with the same master secret can load them with
+        :meth:`load_snapshot` instead of deriving them again.
+
+        A file holds the snapshots of several wallets, keyed by the root
+        address of the wallet, a fingerprint of its master key. The
+        snapshot of this wallet, if any, is replaced.
+
+        The file is replaced atomically, so that an interrupted save
+        leaves it as it was. Concurrent saves from threads of a process
+        are serialized; concurrent saves from several processes may lose
+        all but the last snapshot written, but never corrupt the file.
+
+        .. warning:: The snapshot contains the private keys of the nodes.
+            The file is made readable by its owner only.
+
+        Args:
+            filename (str): Name of the snapshot file. It is created if it
+                does not exist.
+
+        Returns:
+            int: Number of nodes saved.
+
+        """
+        snapshot = []
+        for path, node in self.nodes.items():
+            xprv = (node.hwif(as_private=True)
+                    if node.secret_exponent() is not None else None)
+            snapshot.append([path, node.hwif(), xprv])
+        with _snapshot_lock:
+            snapshots = _read_snapshots(filename)
+            snapshots[self.root_address[1]] = snapshot
+            _write_snapshots(filename, snapshots)
+        return len(snapshot)
+
+    def load_snapshot(self, filename):
+        """
+        Loads into :attr:`nodes` the nodes saved by :meth:`save_snapshot`
+        for this wallet. Loading a node costs no derivation.
+
+        Args:
+            filename (str): Name of the snapshot file.
+
+        Returns:
+            int: Number of nodes loaded, 0 if the file holds no snapshot
+            for this wallet.
+
+        """
+        snapshot = _read_snapshots(filename).get(self.root_address[1], [])
+        for path, xpub, xprv in snapshot:
+            node = BIP32Node.from_hwif(xpub)
+            if xprv is not None:
+                _with_secret(node, from_bytes_32(a2b_hashed_base58(xprv)[46:]))
+            self.nodes.set(path, node)
+        return len(snapshot)
+
+    def _unique_path(self):
+        """
+        Returns:
+            str: a new path from :attr:`path_allocator` if set, or else
+            from :meth:`_unique_hierarchical_string`.
+
+        """
+        if self.path_allocator is not None:
+            return self.path_allocator.next()
+        return self._unique_hierarchical_string()
 
     def _unique_hierarchical_string(self):
         """
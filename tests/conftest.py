@@ -509,3 +509,79 @@ def ownership_not_registered_piece(alice, piece_hashes, rpcuser,
         host=host,
         port=port,
     )
+
+
+def spool_tx(txid, verb, from_address, piece_address, to_address, time,
+             confirmations=10):
+    """
+    Builds the payload of a SPOOL transaction, as returned by
+    :meth:`transactions.Transactions.get`.
+
+    """
+    from spool.spoolverb import op_return_hex
+    return {
+        'txid': txid,
+        'confirmations': confirmations,
+        'time': time,
+        'vins': [{'address': from_address}],
+        'vouts': [
+            {'n': 0, 'value': 3000, 'address': piece_address,
+             'hex': '76a914', 'asm': ''},
+            {'n': 1, 'value': 3000, 'address': to_address,
+             'hex': '76a914', 'asm': ''},
+            {'n': 2, 'value': 0, 'address': None,
+             'hex': op_return_hex(verb), 'asm': ''},
+        ],
+    }
+
+
+@pytest.fixture
+def piece_txs():
+    """
+    Payloads of the transactions of a piece with two editions, the second
+    one transferred from alice to bob.
+
+    """
+    piece, federation, alice, bob = 'piece', 'federation', 'alice', 'bob'
+    return piece, [
+        spool_tx('tx0', 'ASCRIBESPOOL01PIECE', federation, piece, alice, 1),
+        spool_tx('tx1', 'ASCRIBESPOOL01EDITIONS2', federation, piece, alice,
+                 2),
+        spool_tx('tx2', 'ASCRIBESPOOL01REGISTER1', federation, piece, alice,
+                 3),
+        spool_tx('tx3', 'ASCRIBESPOOL01REGISTER2', federation, piece, alice,
+                 4),
+        spool_tx('tx4', 'ASCRIBESPOOL01TRANSFER2', alice, piece, bob, 5),
+    ]
+
+
+@pytest.fixture
+def transactions_mock(monkeypatch, piece_txs):
+    """
+    Replaces :class:`transactions.Transactions` in :mod:`spool.spoolex` by
+    a mock serving :func:`piece_txs`. The ids of the retrieved transactions
+    are recorded in the ``calls`` attribute of the returned class.
+
+    """
+    import threading
+    piece, txs = piece_txs
+
+    class TransactionsMock(object):
+        calls = []
+        lock = threading.Lock()
+
+        def __init__(self, **kwargs):
+            pass
+
+        def get(self, hash, max_transactions=100, **kwargs):
+            if hash == piece:
+                return {'transactions': [
+                    {'txid': tx['txid'], 'confirmations': tx['confirmations'],
+                     'time': tx['time'], 'amount': 3000} for tx in txs],
+                    'unspents': []}
+            with self.lock:
+                TransactionsMock.calls.append(hash)
+            return dict((tx['txid'], tx) for tx in txs)[hash]
+
+    monkeypatch.setattr('spool.spoolex.Transactions', TransactionsMock)
+    return TransactionsMock
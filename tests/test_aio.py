@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import sys
+
+import pytest
+
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 5),
+                                reason='asyncio requires python 3.5')
+
+FILENAME = 'tests/ascribe.png'
+FILE_HASH_TESTNET = 'mv5yDkR5dnjGHxietq7CH78WHk8vzsu4vH'
+FILE_HASH_METADATA_TESTNET = 'mr4yicsC7v3P92YrTf1kQByYWJSmXmoaBS'
+
+
+@pytest.fixture
+def loop():
+    import asyncio
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def async_hasher():
+    from spool.aio import AsyncFileHasher
+    hasher = AsyncFileHasher(max_workers=2, chunk_size=1024)
+    yield hasher
+    hasher.close()
+
+
+def test_async_hash(loop, async_hasher):
+    f = loop.run_until_complete(async_hasher.hash(
+        FILENAME, testnet=True, algorithms=('sha256',),
+        title='ascribe', artist='Rodolphe Marques'))
+    assert f.file_hash == FILE_HASH_TESTNET
+    assert f.file_hash_metadata == FILE_HASH_METADATA_TESTNET
+    assert f.sha256
+
+
+def test_async_hash_many(loop, async_hasher, tmpdir):
+    from spool import File
+    other = tmpdir.join('other')
+    other.write(b'other', mode='wb')
+    metadata = {FILENAME: {'title': 'ascribe', 'artist': 'Rodolphe Marques'}}
+    files = loop.run_until_complete(async_hasher.hash_many(
+        [FILENAME, str(other)], metadata=metadata, testnet=True))
+    assert files[0].file_hash_metadata == FILE_HASH_METADATA_TESTNET
+    assert files[1].file_hash == File(str(other), testnet=True).file_hash
+
+
+def test_async_hash_cancel(loop, tmpdir):
+    import asyncio
+    from spool.aio import AsyncFileHasher
+    big = tmpdir.join('big')
+    big.write(b'0' * 10 ** 7, mode='wb')
+    hasher = AsyncFileHasher(max_workers=1, chunk_size=1)
+    task = loop.create_task(hasher.hash(str(big)))
+    loop.call_later(0.05, task.cancel)
+    with pytest.raises(asyncio.CancelledError):
+        loop.run_until_complete(task)
+    # the executor thread stops reading and is available again
+    hasher.chunk_size = 1024
+    f = loop.run_until_complete(
+        asyncio.wait_for(hasher.hash(FILENAME, testnet=True), 5))
+    assert f.file_hash == FILE_HASH_TESTNET
+    hasher.close()
+
+
+def test_async_history(loop, transactions_mock, piece_txs):
+    from spool.aio import AsyncBlockchainSpider
+    from spool.spoolex import BlockchainSpider
+    piece, txs = piece_txs
+    spider = AsyncBlockchainSpider(max_workers=3)
+    try:
+        tree = loop.run_until_complete(spider.history(piece))
+        txids = loop.run_until_complete(spider.txids(piece))
+    finally:
+        spider.close()
+    assert tree == BlockchainSpider().history(piece)
+    assert txids == [tx['txid'] for tx in txs]
+
+
+def test_async_history_timeout(loop, transactions_mock, piece_txs):
+    import asyncio
+    import time
+    from spool.aio import AsyncBlockchainSpider
+    get = transactions_mock.get
+
+    def slow_get(self, hash, **kwargs):
+        if hash == 'tx2':
+            time.sleep(0.5)
+        return get(self, hash, **kwargs)
+
+    transactions_mock.get = slow_get
+    spider = AsyncBlockchainSpider(timeout=0.1)
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            loop.run_until_complete(spider.history(piece_txs[0]))
+    finally:
+        spider.close()
+
+
+@pytest.mark.parametrize('address,edition_number', [
+    ('alice', 1), ('alice', 2), ('bob', 2), ('alice', 3), ('bob', 0)])
+def test_async_ownership(loop, transactions_mock, piece_txs, address,
+                         edition_number):
+    from spool import Ownership
+    from spool.aio import AsyncBlockchainSpider, AsyncOwnership
+    piece = piece_txs[0]
+    spider = AsyncBlockchainSpider()
+    try:
+        ownership = loop.run_until_complete(AsyncOwnership.create(
+            address, piece, edition_number, spider=spider))
+    finally:
+        spider.close()
+    expected = Ownership(address, piece, edition_number)
+    for name in ('can_transfer', 'can_consign', 'can_loan', 'can_unconsign',
+                 'can_register', 'can_register_master', 'can_editions'):
+        assert getattr(ownership, name) == getattr(expected, name)
+        assert ownership.reason == expected.reason
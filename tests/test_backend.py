@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import hashlib
+
+import bitcoin
+import pytest
+
+from pycoin.key.BIP32Node import BIP32Node
+
+MASTER_SECRET = b'MaStErPaSsWoRd'
+PATHS = ['0', '1H', "2'/3", '0/1/2/3/4/5', '2016/5/3/10/1/0/1']
+
+
+def base_backend():
+    """
+    Returns a backend running the derivation and signing of
+    :class:`spool.backend.Backend` on the curve operations of
+    :class:`spool.backend.PycoinBackend`, so that they are tested without
+    ``coincurve``.
+
+    """
+    from spool.backend import Backend, PycoinBackend
+
+    class BaseBackend(Backend):
+        name = 'base'
+        _pycoin = PycoinBackend()
+
+        def public_pair(self, secret_exponent):
+            return self._pycoin.public_pair(secret_exponent)
+
+        def add(self, public_pair, exponent):
+            return self._pycoin.add(public_pair, exponent)
+
+    return BaseBackend()
+
+
+@pytest.fixture(params=['pycoin', 'base', 'secp256k1'])
+def backend(request):
+    from spool.backend import PycoinBackend, Secp256k1Backend, coincurve
+    if request.param == 'pycoin':
+        return PycoinBackend()
+    if request.param == 'base':
+        return base_backend()
+    if coincurve is None:
+        pytest.skip('coincurve is not installed')
+    return Secp256k1Backend()
+
+
+def test_from_master_secret(backend):
+    node = backend.from_master_secret(MASTER_SECRET, netcode='XTN')
+    expected = BIP32Node.from_master_secret(MASTER_SECRET, netcode='XTN')
+    assert node.hwif(as_private=True) == expected.hwif(as_private=True)
+
+
+@pytest.mark.parametrize('path', PATHS)
+def test_subkey(backend, path):
+    from spool.wallet import _subkey
+    node = backend.from_master_secret(MASTER_SECRET)
+    for component in path.split('/'):
+        node = _subkey(node, component, backend)
+    expected = BIP32Node.from_master_secret(MASTER_SECRET).subkey_for_path(
+        path)
+    assert node.hwif(as_private=True) == expected.hwif(as_private=True)
+    assert node.address() == expected.address()
+
+
+def test_pycoin_subkey_bypasses_cache():
+    from spool.backend import PycoinBackend
+    node = BIP32Node.from_master_secret(MASTER_SECRET)
+    child = PycoinBackend().subkey(node, 1, True, True)
+    # nothing is left in the cache of the children of the pinned pycoin
+    assert not getattr(node, '_subkey_cache', None)
+    assert (child.hwif(as_private=True) ==
+            node.subkey(1, is_hardened=True).hwif(as_private=True))
+
+
+def test_subkey_public(backend):
+    from pycoin.key.BIP32Node import PublicPrivateMismatchError
+    node = BIP32Node.from_master_secret(MASTER_SECRET).public_copy()
+    for i in range(3):
+        assert (backend.subkey(node, i, False, False).hwif() ==
+                node.subkey(i).hwif())
+    with pytest.raises(PublicPrivateMismatchError):
+        backend.subkey(node, 0, True, False)
+
+
+def test_sign(backend):
+    wif = BIP32Node.from_master_secret(MASTER_SECRET).subkey(1).wif()
+    for i in range(10):
+        msghash = hashlib.sha256(str(i).encode()).digest()
+        assert (backend.sign(msghash, wif) ==
+                bitcoin.ecdsa_raw_sign(msghash, wif))
+
+
+def test_signall(backend):
+    key = BIP32Node.from_master_secret(MASTER_SECRET)
+    tx = bitcoin.mktx(['%s:%d' % ('ab' * 32, i) for i in range(3)],
+                      [{'address': key.address(), 'value': 3000}])
+    signed_tx = backend.signall(tx, key.wif())
+    assert signed_tx == bitcoin.signall(tx, key.wif())
+    txobj = bitcoin.deserialize(signed_tx)
+    sig, pub = bitcoin.deserialize_script(txobj['ins'][0]['script'])
+    assert bitcoin.pubkey_to_address(pub) == key.address()
+
+
+def test_default_backend():
+    from spool.backend import default_backend, coincurve
+    expected = 'pycoin' if coincurve is None else 'secp256k1'
+    assert default_backend().name == expected
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import pytest
+
+
+@pytest.fixture
+def hash_cache(tmpdir):
+    from spool.cache import HashCache
+    cache = HashCache(str(tmpdir.join('cache')))
+    yield cache
+    cache.close()
+
+
+def test_hash_cache_get_set(hash_cache, tmpdir):
+    piece = tmpdir.join('piece')
+    piece.write(b'content', mode='wb')
+    assert hash_cache.get(str(piece)) is None
+    hash_cache.set(str(piece), 'digest')
+    assert hash_cache.get(str(piece)) == 'digest'
+    assert hash_cache.hits == 1
+    assert hash_cache.misses == 1
+
+
+def test_hash_cache_changed_file(hash_cache, tmpdir):
+    piece = tmpdir.join('piece')
+    piece.write(b'content', mode='wb')
+    hash_cache.set(str(piece), 'digest')
+    piece.write(b'new content', mode='wb')
+    assert hash_cache.get(str(piece)) is None
+
+
+def test_hash_cache_prune(hash_cache, tmpdir):
+    kept = tmpdir.join('kept')
+    kept.write(b'kept', mode='wb')
+    removed = tmpdir.join('removed')
+    removed.write(b'removed', mode='wb')
+    hash_cache.set(str(kept), 'kept digest')
+    hash_cache.set(str(removed), 'removed digest')
+    removed.remove()
+    assert hash_cache.prune() == 1
+    assert hash_cache.get(str(kept)) == 'kept digest'
+
+
+def test_hash_cache_persistence(tmpdir):
+    from spool.cache import HashCache
+    piece = tmpdir.join('piece')
+    piece.write(b'content', mode='wb')
+    cache = HashCache(str(tmpdir))
+    cache.set(str(piece), 'digest')
+    cache.close()
+    cache = HashCache(str(tmpdir))
+    assert cache.get(str(piece)) == 'digest'
+    cache.close()
+
+
+@pytest.fixture
+def transaction_cache(tmpdir):
+    from spool.cache import TransactionCache
+    cache = TransactionCache(str(tmpdir.join('cache')), min_confirmations=6)
+    yield cache
+    cache.close()
+
+
+def test_transaction_cache_get_set(transaction_cache, piece_txs):
+    from spool.spoolex import BlockchainSpider
+    records = [BlockchainSpider._record(tx) for tx in piece_txs[1]]
+    assert transaction_cache.get('tx0') is None
+    assert transaction_cache.set(records[0], 6)
+    assert not transaction_cache.set(records[1], 5)
+    assert transaction_cache.get('tx0') == records[0]
+    assert transaction_cache.get_many(['tx0', 'tx1']) == {'tx0': records[0]}
+    assert len(transaction_cache) == 1
+    assert transaction_cache.hits == 2
+    assert transaction_cache.misses == 2
+
+
+def test_transaction_cache_persists(tmpdir, piece_txs):
+    from spool.cache import TransactionCache
+    from spool.spoolex import BlockchainSpider
+    records = [BlockchainSpider._record(tx) for tx in piece_txs[1]]
+    cache = TransactionCache(str(tmpdir))
+    for record in records:
+        cache.set(record, 10)
+    cache.close()
+    cache = TransactionCache(str(tmpdir))
+    assert cache.get_many(r['txid'] for r in records) == dict(
+        (r['txid'], r) for r in records)
+    cache.close()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+
+import pytest
+
+
+@pytest.fixture
+def catalog_root(tmpdir):
+    root = tmpdir.mkdir('catalog')
+    root.join('a.png').write(b'a', mode='wb')
+    root.join('b.txt').write(b'b', mode='wb')
+    root.mkdir('scans').join('c.png').write(b'c', mode='wb')
+    root.mkdir('tmp').join('d.png').write(b'd', mode='wb')
+    return root
+
+
+def read_manifest(manifest):
+    with open(str(manifest)) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_catalog_paths(catalog_root, tmpdir):
+    from spool.catalog import Catalog
+    catalog = Catalog(str(catalog_root), str(tmpdir.join('manifest.jsonl')),
+                      include=['*.png'], exclude=['tmp/*'])
+    assert list(catalog.paths()) == ['a.png', 'scans/c.png']
+
+
+def test_catalog_run(catalog_root, tmpdir):
+    from spool import File
+    from spool.catalog import Catalog
+    manifest = tmpdir.join('manifest.jsonl')
+    reports = []
+    catalog = Catalog(str(catalog_root), str(manifest), workers=1,
+                      testnet=True, metadata={'a.png': {'title': 'a'}})
+    totals = catalog.run(progress=reports.append)
+    assert totals.files == 4
+    assert totals.bytes == 4
+    assert reports[-1] == totals
+
+    records = dict((r['path'], r) for r in read_manifest(manifest))
+    assert sorted(records) == ['a.png', 'b.txt', 'scans/c.png', 'tmp/d.png']
+    a = File(str(catalog_root.join('a.png')), testnet=True, title='a')
+    assert records['a.png'] == {'path': 'a.png',
+                                'size': 1,
+                                'file_hash': a.file_hash,
+                                'file_hash_metadata': a.file_hash_metadata}
+
+
+def test_catalog_resume(catalog_root, tmpdir):
+    from spool.catalog import Catalog
+    manifest = tmpdir.join('manifest.jsonl')
+    catalog = Catalog(str(catalog_root), str(manifest), workers=1)
+    catalog.run()
+    lines = manifest.read_binary().splitlines(True)
+    # simulate a run interrupted while writing the third record
+    manifest.write_binary(b''.join(lines[:2]) + lines[2][:10])
+
+    assert sorted(catalog.done()) == ['a.png', 'b.txt']
+    totals = catalog.run()
+    assert totals.files == 2
+    assert len(read_manifest(manifest)) == 4
@@ -41,3 +41,168 @@ def test_file_from_hash():
     from spool import File
     f = File.from_hash(FILE_HASH_TESTNET)
     assert f.hash == FILE_HASH_TESTNET
+
+
+@pytest.mark.parametrize('chunk_size,use_mmap', [
+    (1, False),
+    (1024, False),
+    (10 ** 9, False),
+    (1024, True),
+])
+def test_file_streaming_hash(chunk_size, use_mmap):
+    from spool import File
+    f = File(FILENAME,
+             testnet=True,
+             chunk_size=chunk_size,
+             use_mmap=use_mmap,
+             title='ascribe',
+             artist='Rodolphe Marques')
+    assert f.file_hash == FILE_HASH_TESTNET
+    assert f.file_hash_metadata == FILE_HASH_METADATA_TESTNET
+
+
+def test_file_mmap_empty_file(tmpdir):
+    from spool import File
+    empty = tmpdir.join('empty')
+    empty.write(b'', mode='wb')
+    assert (File(str(empty), use_mmap=True).file_hash ==
+            File(str(empty)).file_hash)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_file_hash_many(workers, tmpdir):
+    from spool import File
+    other = tmpdir.join('other.txt')
+    other.write(b'other content', mode='wb')
+    paths = [FILENAME, str(other)]
+    metadata = {FILENAME: {'title': 'ascribe', 'artist': 'Rodolphe Marques'}}
+    results = {r[0]: r[1:] for r in File.hash_many(
+        paths, metadata=metadata, workers=workers, testnet=True)}
+    assert results[FILENAME] == (FILE_HASH_TESTNET, FILE_HASH_METADATA_TESTNET)
+    other_file = File(str(other), testnet=True)
+    assert results[str(other)] == (other_file.file_hash,
+                                   other_file.file_hash_metadata)
+
+
+def test_file_cache(tmpdir):
+    from spool import File
+    from spool.cache import HashCache
+    cache = HashCache(str(tmpdir))
+    f = File(FILENAME, testnet=True, cache=cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+    cached = File(FILENAME, testnet=True, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cached.file_hash == f.file_hash == FILE_HASH_TESTNET
+    assert cached.md5 == f.md5
+    results = list(File.hash_many([FILENAME], workers=1, testnet=True,
+                                  cache=cache))
+    assert results == [(FILENAME, FILE_HASH_TESTNET, FILE_HASH_TESTNET)]
+    assert (cache.hits, cache.misses) == (2, 1)
+    cache.close()
+
+
+def test_file_from_stream():
+    from spool import File
+    with open(FILENAME, 'rb') as stream:
+        f = File(stream, testnet=True, chunk_size=100,
+                 title='ascribe', artist='Rodolphe Marques')
+    assert f.file_hash == FILE_HASH_TESTNET
+    assert f.file_hash_metadata == FILE_HASH_METADATA_TESTNET
+
+
+@pytest.mark.parametrize('buffer_type', [bytes, bytearray, memoryview])
+def test_file_from_bytes(buffer_type):
+    from spool import File
+    with open(FILENAME, 'rb') as f:
+        data = buffer_type(f.read())
+    f = File.from_bytes(data, testnet=True,
+                        title='ascribe', artist='Rodolphe Marques')
+    assert f.file_hash == FILE_HASH_TESTNET
+    assert f.file_hash_metadata == FILE_HASH_METADATA_TESTNET
+
+
+def test_file_hasher():
+    from spool.file import FileHasher
+    hasher = FileHasher(testnet=True,
+                        title='ascribe', artist='Rodolphe Marques')
+    with open(FILENAME, 'rb') as f:
+        data = f.read()
+    for i in range(0, len(data), 1000):
+        hasher.update(memoryview(data)[i:i + 1000])
+    assert hasher.file_hash == FILE_HASH_TESTNET
+    assert hasher.file_hash_metadata == FILE_HASH_METADATA_TESTNET
+
+
+def test_file_additional_digests():
+    import hashlib
+    from spool import File
+    with open(FILENAME, 'rb') as f:
+        data = f.read()
+    f = File(FILENAME, testnet=True, algorithms=('sha256', 'sha1'))
+    assert f.file_hash == FILE_HASH_TESTNET
+    assert f.md5 == hashlib.md5(data).hexdigest()
+    assert f.sha256 == hashlib.sha256(data).hexdigest()
+    assert f.sha1 == hashlib.sha1(data).hexdigest()
+    assert f.digests == {'md5': f.md5, 'sha256': f.sha256, 'sha1': f.sha1}
+    from_bytes = File.from_bytes(data, testnet=True, algorithms=('sha256',))
+    assert from_bytes.sha256 == f.sha256
+
+
+def test_file_from_digest():
+    from spool import File
+    f = File(FILENAME, testnet=True)
+    derived = File.from_digest(f.md5, testnet=True,
+                               title='ascribe', artist='Rodolphe Marques')
+    assert derived.file_hash == FILE_HASH_TESTNET
+    assert derived.file_hash_metadata == FILE_HASH_METADATA_TESTNET
+    assert derived.md5 == f.md5
+
+
+def test_file_with_metadata():
+    from spool import File
+    f = File(FILENAME, testnet=False, algorithms=('sha256',))
+    edited = f.with_metadata(title='ascribe', artist='Rodolphe Marques')
+    assert edited.file_hash == FILE_HASH_MAINNET
+    assert edited.file_hash_metadata == FILE_HASH_METADATA_MAINNET
+    assert edited.sha256 == f.sha256
+    assert f.file_hash_metadata == FILE_HASH_MAINNET
+
+
+def test_file_derive_many():
+    from spool import File
+    md5 = File(FILENAME).md5
+    other = File.from_bytes(b'other', title='other')
+    records = [
+        (md5, {'title': 'ascribe', 'artist': 'Rodolphe Marques'}),
+        (md5, {}),
+        (other.md5, {'title': 'other'}),
+    ]
+    assert list(File.derive_many(records)) == [
+        (FILE_HASH_MAINNET, FILE_HASH_METADATA_MAINNET),
+        (FILE_HASH_MAINNET, FILE_HASH_MAINNET),
+        (other.file_hash, other.file_hash_metadata),
+    ]
+
+
+def test_file_from_hash_metadata():
+    from spool import File, PieceHash
+    piece_hash = File.from_hash(FILE_HASH_TESTNET, FILE_HASH_METADATA_TESTNET)
+    assert piece_hash == PieceHash(FILE_HASH_TESTNET,
+                                   FILE_HASH_METADATA_TESTNET)
+    assert File.from_hash(FILE_HASH_TESTNET).file_hash_metadata == \
+        FILE_HASH_TESTNET
+
+
+def test_piece_hash():
+    from spool import File, PieceHash
+    f = File(FILENAME, testnet=True,
+             title='ascribe', artist='Rodolphe Marques')
+    piece_hash = f.piece_hash
+    file_hash, file_hash_metadata = piece_hash
+    assert file_hash == piece_hash.file_hash == FILE_HASH_TESTNET
+    assert file_hash_metadata == FILE_HASH_METADATA_TESTNET
+    assert piece_hash == (FILE_HASH_TESTNET, FILE_HASH_METADATA_TESTNET)
+    assert {piece_hash: 1}[PieceHash(*piece_hash)] == 1
+    assert not hasattr(piece_hash, '__dict__')
+    with pytest.raises(AttributeError):
+        piece_hash.file_hash = FILE_HASH_MAINNET
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import pytest
+
+
+def spool_tx(verb, from_key, piece_key, to_key, prev=b'\1'):
+    """
+    Builds a SPOOL transaction, paying ``piece_key`` and ``to_key`` from
+    ``from_key``, with a dummy signature.
+
+    """
+    from pycoin.tx.Tx import Tx
+    from pycoin.tx.TxIn import TxIn
+    from pycoin.tx.TxOut import TxOut
+    from pycoin.tx.pay_to import ScriptPayToAddress
+    sig = b'\x30' + b'\0' * 69 + b'\x01'
+    sec = from_key.sec()
+    script_sig = (bytearray([len(sig)]) + sig +
+                  bytearray([len(sec)]) + sec)
+    txs_out = [
+        TxOut(600, ScriptPayToAddress(piece_key.hash160()).script()),
+        TxOut(600, ScriptPayToAddress(to_key.hash160()).script()),
+        TxOut(0, b'\x6a' + bytearray([len(verb)]) + verb),
+    ]
+    return Tx(1, [TxIn(prev * 32, 0, bytes(script_sig))], txs_out)
+
+
+class RawBlock(object):
+    """
+    Serialized block, built without :class:`pycoin.block.Block`, whose
+    constructor differs between the supported versions of ``pycoin``.
+
+    """
+
+    def __init__(self, txs, timestamp, previous=b'\0' * 32):
+        import struct
+        from pycoin.encoding import double_sha256
+        from pycoin.merkle import merkle
+        self.txs = txs
+        self.timestamp = timestamp
+        self.header = struct.pack(
+            '<L32s32sLLL', 1, previous,
+            merkle([tx.hash() for tx in txs], double_sha256), timestamp, 0, 0)
+
+    def hash(self):
+        from pycoin.encoding import double_sha256
+        return double_sha256(self.header)
+
+    def id(self):
+        from pycoin.serialize import b2h_rev
+        return b2h_rev(self.hash())
+
+    def as_hex(self):
+        import binascii
+        data = self.header + bytearray([len(self.txs)]) + b''.join(
+            tx.as_bin() for tx in self.txs)
+        return binascii.hexlify(data).decode('ascii')
+
+
+class RPCMock(object):
+    """
+    Serves the blocks of :attr:`blocks` as a bitcoin node does.
+
+    """
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+
+    def getblockcount(self):
+        return len(self.blocks) - 1
+
+    def getblockhash(self, height):
+        return self.blocks[height].id()
+
+    def getblock(self, block_hash, verbose=True):
+        assert not verbose
+        return [b for b in self.blocks if b.id() == block_hash][0].as_hex()
+
+
+@pytest.fixture
+def keys():
+    from pycoin.key import Key
+    return dict((name, Key(secret_exponent=i + 1, netcode='XTN'))
+                for i, name in enumerate(
+                    ('federation', 'piece', 'alice', 'bob')))
+
+
+@pytest.fixture
+def chain(keys):
+    from pycoin.tx.Tx import Tx
+    from pycoin.tx.TxIn import TxIn
+    from pycoin.tx.TxOut import TxOut
+    federation, piece, alice, bob = (
+        keys[name] for name in ('federation', 'piece', 'alice', 'bob'))
+    coinbase = Tx(1, [TxIn.coinbase_tx_in(b'\0')], [TxOut(50, b'\x51')])
+    blocks = [RawBlock([coinbase], 1)]
+    blocks.append(RawBlock([
+        spool_tx(b'ASCRIBESPOOL01PIECE', federation, piece, alice, b'\1'),
+        spool_tx(b'ASCRIBESPOOL01EDITIONS2', federation, piece, alice, b'\2'),
+    ], 2, blocks[-1].hash()))
+    blocks.append(RawBlock([
+        spool_tx(b'ASCRIBESPOOL01REGISTER2', federation, piece, alice, b'\3'),
+        spool_tx(b'ASCRIBESPOOL01TRANSFER2', alice, piece, bob, b'\4'),
+    ], 3, blocks[-1].hash()))
+    return blocks
+
+
+@pytest.fixture
+def spool_index(tmpdir):
+    from spool.index import SpoolIndex
+    index = SpoolIndex(str(tmpdir.join('index.sqlite')))
+    yield index
+    index.close()
+
+
+def test_scan(spool_index, chain, keys):
+    from spool.index import BlockScanner, _payload
+    from spool.spoolex import BlockchainSpider
+    scanner = BlockScanner(spool_index, RPCMock(chain), testnet=True)
+    assert scanner.scan() == 4
+    assert spool_index.height == 2
+    assert scanner.scan() == 0
+
+    piece, alice, bob = (keys[name].address()
+                         for name in ('piece', 'alice', 'bob'))
+    assert [r['action'] for r in spool_index.records(piece_address=piece)] == [
+        'PIECE', 'EDITIONS', 'REGISTER', 'TRANSFER']
+    transfer, = spool_index.records(from_address=alice)
+    assert spool_index.records(to_address=bob) == [transfer]
+    assert transfer['verb'] == b'ASCRIBESPOOL01TRANSFER2'
+    assert transfer['timestamp_utc'] == 3
+
+    spider = BlockchainSpider(index=spool_index)
+    tree = spider.history(piece)
+    assert set(tree) == set(['', 0, 2])
+    assert [d['from_address'] for d in tree[2]] == [
+        keys['federation'].address(), alice]
+    payloads = [_payload(tx, b.timestamp, 'XTN')
+                for b in chain[1:] for tx in b.txs]
+    assert tree == BlockchainSpider._tree(payloads)
+
+
+def test_scan_resume(spool_index, chain):
+    from spool.index import BlockScanner
+    scanner = BlockScanner(spool_index, RPCMock(chain), testnet=True)
+    assert scanner.scan(stop=1) == 2
+    assert spool_index.height == 1
+    assert scanner.scan() == 2
+    assert len(spool_index) == 4
+
+
+def test_scan_nonstandard_output(spool_index, chain, keys):
+    from pycoin.tx.TxOut import TxOut
+    from spool.index import BlockScanner
+    tx = spool_tx(b'ASCRIBESPOOL01REGISTER1', keys['federation'],
+                  keys['piece'], keys['alice'], b'\5')
+    # bare 1-of-1 multisig, whose address pycoin cannot compute
+    sec = keys['bob'].sec()
+    tx.txs_out.insert(1, TxOut(600, bytes(
+        b'\x51' + bytearray([len(sec)]) + sec + b'\x51\xae')))
+    chain.append(RawBlock([tx], 4, chain[-1].hash()))
+    scanner = BlockScanner(spool_index, RPCMock(chain), testnet=True)
+    assert scanner.scan() == 5
+    assert spool_index.height == 3
+    assert spool_index.records(
+        to_address=keys['alice'].address())[-1]['txid'] == tx.id()
+
+
+def test_scan_reorg(spool_index, chain, keys):
+    from spool.index import BlockScanner
+    rpc = RPCMock(chain)
+    scanner = BlockScanner(spool_index, rpc, testnet=True)
+    scanner.scan()
+    rpc.blocks = chain[:2] + [RawBlock([spool_tx(
+        b'ASCRIBESPOOL01REGISTER1', keys['federation'], keys['piece'],
+        keys['alice'], b'\5')], 4, chain[1].hash())]
+    assert scanner.scan() == 1
+    assert spool_index.block_hash(2) == rpc.blocks[2].id()
+    assert [r['verb'] for r in spool_index.records()] == [
+        b'ASCRIBESPOOL01PIECE', b'ASCRIBESPOOL01EDITIONS2',
+        b'ASCRIBESPOOL01REGISTER1']
+
+
+def test_spider_from_index(transactions_mock, piece_txs, spool_index,
+                           monkeypatch):
+    from spool.spoolex import BlockchainSpider
+    piece, txs = piece_txs
+    spool_index.add_block(0, 'hash', [BlockchainSpider._record(tx)
+                                      for tx in txs[:-1]])
+    spider = BlockchainSpider(index=spool_index)
+
+    def get(self, *args, **kwargs):
+        raise AssertionError('the bitcoin service is queried')
+    monkeypatch.setattr(transactions_mock, 'get', get)
+
+    tree, watermark = spider.refresh(piece)
+    assert tree == spider.history(piece)
+    assert watermark == frozenset(tx['txid'] for tx in txs[:-1])
+    spool_index.add_block(1, 'hash', [BlockchainSpider._record(txs[-1])])
+    tree, watermark = spider.refresh(piece, tree, watermark)
+    assert tree == BlockchainSpider._tree(txs)
+    assert watermark == frozenset(tx['txid'] for tx in txs)
+    assert spider.txids(piece) == [tx['txid'] for tx in txs]
+
+
+def test_history_from_index(transferred_edition_two_hashes, spider, rpconn,
+                            tmpdir):
+    from spool.index import BlockScanner, SpoolIndex
+    index = SpoolIndex(str(tmpdir.join('index.sqlite')))
+    BlockScanner(index, rpconn, testnet=True).scan()
+    piece_address = transferred_edition_two_hashes[0]
+    tree = spider.history(piece_address)
+    spider.index = index
+    indexed_tree = spider.history(piece_address)
+    index.close()
+    # the times of the blocks and of the wallet transactions may differ
+    assert dict((edition, set(d['txid'] for d in chain))
+                for edition, chain in tree.items()) == dict(
+        (edition, set(d['txid'] for d in chain))
+        for edition, chain in indexed_tree.items())
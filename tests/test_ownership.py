@@ -304,3 +304,11 @@ def test_can_unconsign_not_consigned(ownership_edition_one):
             'Edition number {} is not consigned to {}'.format(
                 ownership_edition_one.edition_number,
                 ownership_edition_one.address))
+
+
+def test_ownership_closes_spider(transactions_mock, piece_txs):
+    piece, txs = piece_txs
+    ownership = Ownership('bob', piece, 2)
+    assert transactions_mock.calls
+    assert ownership._bcs._pool is None
+    assert ownership.can_transfer
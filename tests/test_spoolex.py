@@ -198,6 +198,14 @@ def test_simplest_history(federation, alice, piece_hashes,
     assert piece_registration_data['verb'] == b'ASCRIBESPOOL01PIECE'
 
 
+def test_txids(registered_piece_hashes, spider):
+    file_hash, file_hash_metadata = registered_piece_hashes
+    txids = spider.txids(file_hash)
+    assert len(txids) == 1
+    assert spider.txids(file_hash_metadata) == txids
+    assert spider.history(file_hash)[''][0]['txid'] == txids[0]
+
+
 def test_register_editions_qty_history(federation,
                                        alice,
                                        registered_piece_hashes,
@@ -365,3 +373,112 @@ def test_pprint(transferred_edition_two_hashes, spider):
     from spool import BlockchainSpider
     history = spider.history(transferred_edition_two_hashes[0])
     BlockchainSpider.pprint(history)
+
+
+@pytest.mark.parametrize('max_workers', [1, 3])
+def test_history_concurrent(transactions_mock, piece_txs, max_workers):
+    from spool.spoolex import BlockchainSpider
+    piece, txs = piece_txs
+    spider = BlockchainSpider(max_workers=max_workers)
+    tree = spider.history(piece)
+    assert sorted(transactions_mock.calls) == [tx['txid'] for tx in txs]
+    assert set(tree) == set(['', 0, 1, 2])
+    assert [d['action'] for d in tree['']] == ['PIECE']
+    assert [d['action'] for d in tree[0]] == ['EDITIONS']
+    assert [d['action'] for d in tree[2]] == ['REGISTER', 'TRANSFER']
+    assert tree[2][-1]['from_address'] == 'alice'
+    assert tree[2][-1]['to_address'] == 'bob'
+    assert all(d['number_editions'] == 2
+               for chain in tree.values() for d in chain)
+    assert tree == BlockchainSpider._tree(txs)
+
+
+def test_history_timeout(transactions_mock, piece_txs):
+    import time
+    from multiprocessing import TimeoutError
+    from spool.spoolex import BlockchainSpider
+    get = transactions_mock.get
+
+    def slow_get(self, hash, **kwargs):
+        if hash == 'tx2':
+            time.sleep(0.5)
+        return get(self, hash, **kwargs)
+
+    transactions_mock.get = slow_get
+    spider = BlockchainSpider(max_workers=2, timeout=0.1)
+    with pytest.raises(TimeoutError):
+        spider.history(piece_txs[0])
+
+
+def test_history_cache(transactions_mock, piece_txs, tmpdir):
+    from spool.cache import TransactionCache
+    from spool.spoolex import BlockchainSpider
+    piece, txs = piece_txs
+    # the last transfer is not confirmed enough to be cached
+    txs[-1]['confirmations'] = 1
+    cache = TransactionCache(str(tmpdir), min_confirmations=6)
+    spider = BlockchainSpider(cache=cache)
+    tree = spider.history(piece)
+    assert len(cache) == 4
+    del transactions_mock.calls[:]
+    assert spider.history(piece) == tree
+    assert transactions_mock.calls == ['tx4']
+    assert tree == BlockchainSpider._tree(txs)
+    cache.close()
+
+
+def test_refresh(transactions_mock, piece_txs):
+    from spool.spoolex import BlockchainSpider
+    piece, txs = piece_txs
+    transfer = txs.pop()
+    spider = BlockchainSpider()
+    tree, watermark = spider.refresh(piece)
+    assert tree == spider.history(piece)
+    assert watermark == frozenset(['tx0', 'tx1', 'tx2', 'tx3'])
+
+    # the block of a new transaction may be older than its parent
+    transfer['time'] = 0
+    txs.append(transfer)
+    del transactions_mock.calls[:]
+    tree, watermark = spider.refresh(piece, tree, watermark)
+    assert transactions_mock.calls == ['tx4']
+    assert watermark == frozenset(tx['txid'] for tx in txs)
+    assert tree == BlockchainSpider._tree(txs)
+
+    del transactions_mock.calls[:]
+    assert spider.refresh(piece, tree, watermark) == (tree, watermark)
+    assert spider.refresh(piece, tree) == (tree, watermark)
+    assert transactions_mock.calls == []
+
+
+def test_history_reuses_threads(transactions_mock, piece_txs):
+    import threading
+    from spool.spoolex import BlockchainSpider
+    instances = []
+    threads = {}
+    get = transactions_mock.get
+
+    def counting_init(self, **kwargs):
+        instances.append(self)
+
+    def recording_get(self, hash, **kwargs):
+        threads.setdefault(id(self), set()).add(threading.current_thread())
+        return get(self, hash, **kwargs)
+
+    transactions_mock.__init__ = counting_init
+    transactions_mock.get = recording_get
+    spider = BlockchainSpider(max_workers=2)
+    tree = spider.history(piece_txs[0])
+    for _ in range(3):
+        assert spider.history(piece_txs[0]) == tree
+    # one connection for the spider, and one per thread of its pool
+    assert len(instances) <= 3
+    spider.close()
+
+    # the connection of a thread is never used by another thread
+    sequential = BlockchainSpider(max_workers=1)
+    sequential.history(piece_txs[0])
+    thread = threading.Thread(target=sequential.history, args=(piece_txs[0],))
+    thread.start()
+    thread.join()
+    assert all(len(used_by) == 1 for used_by in threads.values())
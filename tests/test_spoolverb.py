@@ -184,3 +184,113 @@ def test_from_verb_migrate():
     assert spoolverb.num_editions is None
     assert spoolverb.edition_number == 28
     assert spoolverb.action == 'MIGRATE'
+
+
+def test_from_verb_bytes():
+    from spool import Spoolverb
+    spoolverb = Spoolverb.from_verb(b'ASCRIBESPOOL01LOAN5/150526150528')
+    assert spoolverb.meta == 'ASCRIBESPOOL'
+    assert spoolverb.action == 'LOAN'
+    assert spoolverb.edition_number == 5
+    assert spoolverb.loan_start == '150526'
+    assert spoolverb.loan_end == '150528'
+
+
+def test_from_verb_with_invalid_bytes():
+    from spool import Spoolverb
+    from spool.spoolverb import SpoolverbError
+    with pytest.raises(SpoolverbError) as exc:
+        Spoolverb.from_verb(b'verb\xff')
+    assert exc.value.message == 'Invalid spoolverb: verb�'
+
+
+def test_decode_many():
+    from spool import Spoolverb
+    verbs = ['ASCRIBESPOOL01EDITIONS10', b'ASCRIBESPOOL01TRANSFER3',
+             'ASCRIBESPOOL01FUEL', 'ASCRIBESPOOL01TRANSFER3',
+             'ASCRIBESPOOL01FUEL']
+    spoolverbs = Spoolverb.decode_many(verbs)
+    assert [s.action for s in spoolverbs] == [
+        'EDITIONS', 'TRANSFER', 'FUEL', 'TRANSFER', 'FUEL']
+    assert spoolverbs[0].num_editions == 10
+    assert spoolverbs[1].edition_number == 3
+    assert spoolverbs[1] == spoolverbs[3]
+    assert spoolverbs[2] is spoolverbs[4]
+
+
+def test_decode_many_invalid():
+    from spool import Spoolverb
+    from spool.spoolverb import SpoolverbError
+    verbs = ['ASCRIBESPOOL01PIECE', 'verbverbverb']
+    with pytest.raises(SpoolverbError):
+        Spoolverb.decode_many(verbs)
+    spoolverbs = Spoolverb.decode_many(verbs, strict=False)
+    assert spoolverbs[0].action == 'PIECE'
+    assert spoolverbs[1] is None
+
+
+@pytest.mark.parametrize('verb', [
+    'ASCRIBESPOOL01REGISTER', 'ASCRIBESPOOL01EDITIONS', 'ASCRIBESPOOL01LOAN1',
+    'ASCRIBESPOOL01LOAN'])
+def test_missing_argument(verb):
+    from spool import Spoolverb
+    from spool.spoolverb import SpoolverbError
+    with pytest.raises(SpoolverbError):
+        Spoolverb.from_verb(verb)
+    assert Spoolverb.decode_many([verb, 'ASCRIBESPOOL01FUEL'],
+                                 strict=False)[0] is None
+
+
+def test_spoolverb_is_immutable():
+    from spool import Spoolverb
+    spoolverb = Spoolverb(edition_num=3)
+    with pytest.raises(AttributeError):
+        spoolverb.edition_number = 4
+    with pytest.raises(AttributeError):
+        spoolverb.title = 'title'
+    assert not hasattr(spoolverb, '__dict__')
+
+
+def test_spoolverb_memoized_encodings():
+    from spool import Spoolverb
+    assert Spoolverb(edition_num=3).transfer is Spoolverb(
+        edition_num=3).transfer
+    assert Spoolverb().fuel is Spoolverb().fuel
+
+
+def test_spoolverb_equality():
+    from spool import Spoolverb
+    spoolverb = Spoolverb.from_verb('ASCRIBESPOOL01TRANSFER3')
+    assert spoolverb == Spoolverb(edition_num=3, action='TRANSFER')
+    assert spoolverb != Spoolverb(edition_num=4, action='TRANSFER')
+    assert len(set([spoolverb, Spoolverb.from_verb(spoolverb.transfer)])) == 1
+
+
+def test_op_return_hex():
+    from spool import Spoolverb
+    from spool.spoolverb import op_return_hex
+    verb = Spoolverb().fuel
+    script = op_return_hex(verb)
+    assert script == '6a124153435249424553504f4f4c30314655454c'
+    assert op_return_hex(verb) is script
+    assert op_return_hex(verb.encode()) == script
+
+
+@pytest.mark.parametrize('spoolverb_kwargs', [
+    dict(edition_num=3, loan_start='150526', loan_end='150528',
+         action='LOAN'),
+    dict(num_editions=10, action='EDITIONS'),
+    dict(meta='OTHERSPOOL', version='02', action='PIECE'),
+])
+def test_spoolverb_pickle_and_copy(spoolverb_kwargs):
+    import copy
+    import pickle
+    from spool import Spoolverb
+    spoolverb = Spoolverb(**spoolverb_kwargs)
+    copies = [copy.copy(spoolverb), copy.deepcopy(spoolverb)]
+    copies.extend(pickle.loads(pickle.dumps(spoolverb, protocol))
+                  for protocol in range(pickle.HIGHEST_PROTOCOL + 1))
+    for other in copies:
+        assert type(other) is Spoolverb
+        assert other == spoolverb
+        assert other._asdict() == spoolverb._asdict()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+from builtins import object
+
+import pytest
+
+
+FILENAME = 'tests/ascribe.png'
+
+
+class SpiderMock(object):
+
+    def __init__(self, registered):
+        self.registered = registered
+
+    def txids(self, address):
+        return ['txid'] if address in self.registered else []
+
+
+@pytest.fixture
+def files(tmpdir):
+    from spool import File
+    other = tmpdir.join('other')
+    other.write(b'other', mode='wb')
+    metadata = {FILENAME: {'title': 'ascribe'}}
+    return ([FILENAME, str(other)], metadata,
+            File(FILENAME, title='ascribe'), File(str(other)))
+
+
+def test_verify(files):
+    from spool.verify import Verifier
+    paths, metadata, piece, other = files
+    spider = SpiderMock([piece.file_hash, piece.file_hash_metadata])
+    report = Verifier(spider=spider, workers=1).verify(paths, metadata)
+    assert report.registered == [
+        (FILENAME, piece.file_hash, piece.file_hash_metadata)]
+    assert report.unregistered == [
+        (paths[1], other.file_hash, other.file_hash_metadata)]
+    assert report.mismatched == []
+    assert report.files == 2
+    assert report.files_per_second > 0
+
+
+def test_verify_mismatched_metadata(files):
+    from spool.verify import Verifier
+    paths, metadata, piece, other = files
+    spider = SpiderMock([piece.file_hash, other.file_hash])
+    report = Verifier(spider=spider, workers=2).verify(paths, metadata)
+    assert report.mismatched == [
+        (FILENAME, piece.file_hash, piece.file_hash_metadata)]
+    # a file without metadata only needs its file hash to be registered
+    assert report.registered == [
+        (paths[1], other.file_hash, other.file_hash_metadata)]
+    assert report.unregistered == []
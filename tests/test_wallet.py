@@ -33,3 +33,245 @@ class TestWallet(unittest.TestCase):
         t = datetime.utcnow()
         now = '%s/%s/%s/%s/%s' % (t.year, t.month, t.day, t.hour, t.minute)
         self.assertTrue(path.find(now) != -1)
+
+    def test_node_cache(self):
+        wallet = Wallet(MASTER_PASSWORD)
+
+        path, address = wallet.address_from_path('0/1/2/3/4/5')
+        self.assertEqual((wallet.nodes.hits, wallet.nodes.misses), (0, 1))
+        self.assertEqual(len(wallet.nodes), 6)
+        self.assertEqual(wallet.address_from_path('0/1/2/3/4/5'),
+                         (path, address))
+        self.assertEqual((wallet.nodes.hits, wallet.nodes.misses), (1, 1))
+
+        # derived from the cached '0/1/2' node
+        self.assertEqual(wallet.address_from_path('0/1/2/7')[1],
+                         wallet.wallet.subkey_for_path('0/1/2/7').address())
+        self.assertEqual(len(wallet.nodes), 7)
+
+    def test_node_cache_hardened(self):
+        wallet = Wallet(MASTER_PASSWORD)
+
+        self.assertEqual(wallet.address_from_path('1H/2/3p')[1],
+                         wallet.wallet.subkey_for_path('1H/2/3p').address())
+
+    def test_node_cache_eviction(self):
+        wallet = Wallet(MASTER_PASSWORD, cache_size=3)
+
+        wallet.address_from_path('0/1/2/3/4/5')
+        self.assertEqual(len(wallet.nodes), 3)
+        self.assertIn('0/1/2/3/4/5', wallet.nodes)
+        self.assertNotIn('0/1/2', wallet.nodes)
+        self.assertEqual(wallet.address_from_path('0/1/2/3/4/5'),
+                         ('0/1/2/3/4/5', '1F2AMKyeV2DCdehRfDj3Qq1jhaZS8MSzMq'))
+
+    def test_addresses_for_paths(self):
+        import spool.wallet
+        wallet = Wallet(MASTER_PASSWORD)
+        paths = ['2016/5/3/10/1/0/1', '2016/5/3/10/1/0/2', '2016/5/3/11',
+                 '0/1/2/3/4/5', '2016/5/3/10/1/0/1', '2016/5/3']
+
+        derivations = []
+        subkey = spool.wallet._subkey
+
+        def counting_subkey(node, component, backend):
+            derivations.append(component)
+            return subkey(node, component, backend)
+
+        spool.wallet._subkey = counting_subkey
+        try:
+            addresses = wallet.addresses_for_paths(paths)
+        finally:
+            spool.wallet._subkey = subkey
+
+        self.assertEqual(
+            addresses,
+            [(path, wallet.wallet.subkey_for_path(path).address())
+             for path in paths])
+        self.assertIn(('0/1/2/3/4/5', '1F2AMKyeV2DCdehRfDj3Qq1jhaZS8MSzMq'),
+                      addresses)
+        # 2016/5/3 once, 10/1/0 once, then 1, 2 and 11, and 0/1/2/3/4/5
+        self.assertEqual(len(derivations), 3 + 3 + 3 + 6)
+
+    def test_path_allocator(self):
+        from spool.wallet import PathAllocator
+        allocator = PathAllocator('7/1')
+        wallet = Wallet(MASTER_PASSWORD, path_allocator=allocator)
+
+        self.assertEqual(wallet.address_from_path()[0], '7/1/0')
+        path, address = wallet.address_from_path()
+        self.assertEqual(path, '7/1/1')
+        self.assertEqual(address,
+                         wallet.wallet.subkey_for_path('7/1/1').address())
+        # the parent node is cached: the new leaf is its only derivation
+        self.assertEqual(len(wallet.nodes), 4)
+
+    def test_path_allocator_default_prefix(self):
+        from spool.wallet import PathAllocator
+        path = PathAllocator().next()
+        self.assertEqual(len(path.split('/')), 4)
+        self.assertTrue(path.endswith('/0'))
+        # allocators created at the same time do not share their prefix
+        self.assertEqual(len(set(PathAllocator().prefix for _ in range(100))),
+                         100)
+        self.assertTrue(all(int(component) <= PathAllocator.MAX_INDEX
+                            for component in path.split('/')))
+
+    def test_path_allocator_invalid_prefix(self):
+        from spool.wallet import PathAllocator
+        PathAllocator("7/1'")
+        self.assertRaises(ValueError, PathAllocator,
+                          str(PathAllocator.MAX_INDEX + 1))
+        self.assertRaises(ValueError, PathAllocator, '7//1')
+        self.assertRaises(ValueError, PathAllocator, '7/x')
+
+    def test_path_allocator_threads(self):
+        import threading
+        from spool.wallet import PathAllocator
+        allocator = PathAllocator('1')
+        paths = []
+
+        def allocate():
+            paths.extend(allocator.next() for _ in range(1000))
+
+        threads = [threading.Thread(target=allocate) for _ in range(4)]
+        [t.start() for t in threads]
+        [t.join() for t in threads]
+        self.assertEqual(len(set(paths)), 4000)
+
+    def test_path_allocator_overflow(self):
+        from spool.wallet import PathAllocator
+        allocator = PathAllocator('1', start=PathAllocator.MAX_INDEX)
+        allocator.next()
+        self.assertRaises(OverflowError, allocator.next)
+
+    def test_address_pool(self):
+        import time
+        from spool.wallet import PathAllocator
+        wallet = Wallet(MASTER_PASSWORD, path_allocator=PathAllocator('3'))
+        wallet.start_address_pool(size=8, low_watermark=2)
+        try:
+            deadline = time.time() + 30
+            while len(wallet.address_pool) < 8 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(len(wallet.address_pool), 8)
+
+            addresses = [wallet.address_from_path() for _ in range(20)]
+        finally:
+            wallet.stop_address_pool()
+        self.assertIsNone(wallet.address_pool)
+
+        paths = [path for path, _ in addresses]
+        self.assertEqual(len(set(paths)), 20)
+        for path, address in addresses:
+            self.assertEqual(
+                address, wallet.wallet.subkey_for_path(path).address())
+
+    def test_address_pool_invalid_low_watermark(self):
+        from spool.wallet import AddressPool
+        wallet = Wallet(MASTER_PASSWORD)
+        self.assertRaises(ValueError, AddressPool, wallet, size=5,
+                          low_watermark=5)
+        self.assertRaises(ValueError, AddressPool, wallet, size=5,
+                          low_watermark=-1)
+        self.assertIsNone(wallet.address_pool)
+
+    def test_address_index(self):
+        import os
+        import shutil
+        import tempfile
+        from spool.wallet import AddressIndex
+        tmpdir = tempfile.mkdtemp()
+        filename = os.path.join(tmpdir, 'addresses.sqlite')
+        try:
+            index = AddressIndex(filename)
+            wallet = Wallet(MASTER_PASSWORD, address_index=index)
+            path, address = wallet.address_from_path('0/1/2/3/4/5')
+            pairs = wallet.addresses_for_paths(['1/1', '1/2'])
+
+            self.assertEqual(wallet.path_for_address(address),
+                             (path, address))
+            self.assertEqual(wallet.path_for_address(pairs[1][1]), pairs[1])
+            self.assertEqual(wallet.path_for_address(wallet.root_address[1]),
+                             wallet.root_address)
+            self.assertIsNone(wallet.path_for_address('unknown'))
+
+            # the entries are committed as soon as the addresses are handed
+            # out, without closing the index
+            other = AddressIndex(filename)
+            self.assertEqual(other.lookup(address), path)
+            other.close()
+            index.close()
+
+            index = AddressIndex(filename)
+            self.assertEqual(len(index), 3)
+            self.assertEqual(index.lookup(address), path)
+            index.update([('9/9', 'address')])
+            self.assertEqual(index.lookup('address'), '9/9')
+            index.close()
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_derive_many(self):
+        wallet = Wallet(MASTER_PASSWORD)
+        paths = ['2016/5/3/{}/{}'.format(i % 3, i) for i in range(25)]
+        paths += ['0/1/2/3/4/5', '1H/2', '']
+        expected = wallet.addresses_for_paths(paths)
+
+        self.assertEqual(list(wallet.derive_many(paths, workers=1,
+                                                 chunk_size=7)), expected)
+        self.assertEqual(list(wallet.derive_many(iter(paths), workers=2,
+                                                 chunk_size=7)), expected)
+
+    def test_snapshot(self):
+        import os
+        import shutil
+        import tempfile
+        tmpdir = tempfile.mkdtemp()
+        filename = os.path.join(tmpdir, 'snapshot.json')
+        try:
+            wallet = Wallet(MASTER_PASSWORD)
+            wallet.address_from_path('0/1/2/3/4/5')
+            wallet.address_from_path('7H/1')
+            other = Wallet('other password')
+            other.address_from_path('1')
+            self.assertEqual(wallet.save_snapshot(filename), 8)
+            self.assertEqual(other.save_snapshot(filename), 1)
+
+            warm = Wallet(MASTER_PASSWORD)
+            self.assertEqual(warm.load_snapshot(filename), 8)
+            self.assertEqual(Wallet('unknown').load_snapshot(filename), 0)
+            self.assertEqual(len(warm.nodes), 8)
+            for path in ('0/1/2/3/4/5', '0/1/2', '7H/1'):
+                node = warm.subkey_for_path(path)
+                expected = wallet.wallet.subkey_for_path(path)
+                self.assertEqual(node.hwif(as_private=True),
+                                 expected.hwif(as_private=True))
+            self.assertEqual(warm.nodes.misses, 0)
+            self.assertEqual(warm.address_from_path('0/1/2/3/4/5'),
+                             ('0/1/2/3/4/5',
+                              '1F2AMKyeV2DCdehRfDj3Qq1jhaZS8MSzMq'))
+            self.assertEqual(os.stat(filename).st_mode & 0o777, 0o600)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_snapshot_replaces_file(self):
+        import os
+        import shutil
+        import tempfile
+        tmpdir = tempfile.mkdtemp()
+        filename = os.path.join(tmpdir, 'snapshot.json')
+        try:
+            with open(filename, 'w') as f:
+                f.write('{}')
+            os.chmod(filename, 0o644)
+            wallet = Wallet(MASTER_PASSWORD)
+            wallet.address_from_path('1')
+            self.assertEqual(wallet.save_snapshot(filename), 1)
+            self.assertEqual(os.stat(filename).st_mode & 0o777, 0o600)
+            # no temporary file is left behind
+            self.assertEqual(os.listdir(tmpdir), ['snapshot.json'])
+            self.assertEqual(Wallet(MASTER_PASSWORD).load_snapshot(filename),
+                             1)
+        finally:
+            shutil.rmtree(tmpdir)